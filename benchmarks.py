@@ -0,0 +1,839 @@
+"""
+Benchmarks e checagens de paridade das rotas rápidas.
+
+Uso:
+    python benchmarks.py vec_env --lanes 1024 --steps 2000
+    python benchmarks.py scalar_env --steps 200000
+    python benchmarks.py clone --reps 20000
+    python benchmarks.py startup --reps 20
+    python benchmarks.py frame_skip --ticks 100000
+    python benchmarks.py course --episodes 40
+    python benchmarks.py expert_batch --n 2000000
+    python benchmarks.py expert_table --n 2000000 --bins 64
+    python benchmarks.py dataset_io --csv data_final.csv
+    python benchmarks.py coreset --csv data_final.csv
+    python benchmarks.py stream_train --rows 20000000
+    python benchmarks.py solvers --csv data_final.csv
+    python benchmarks.py grid_train --csv data_final.csv
+    python benchmarks.py train_core --rows 2000000 --epochs 20
+    python benchmarks.py data_parallel --rows 8000000 --workers 1 2 4
+    python benchmarks.py cross_val --csv data_final.csv --folds 5
+"""
+import argparse
+import copy
+import random
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+from game_env import FlappyEnv, VecFlappyEnv, Config, CourseTable, _load_pygame
+from seeding import env_seeds
+from expert_policy import expert_action, expert_action_batch
+
+
+class LegacyFlappyEnv:
+    """Implementação original (lista de tuplas) do FlappyEnv, usada como referência."""
+    def __init__(self, cfg: Config = Config()):
+        self.cfg = cfg
+        self.rng = random.Random(cfg.seed)
+        self.y = 0.0
+        self.vy = 0.0
+        self.pipes = []
+        self.steps = 0
+        self.score = 0
+
+    def reset(self):
+        self.y = self.cfg.height * 0.5
+        self.vy = 0.0
+        self.steps = 0
+        self.score = 0
+        self.pipes.clear()
+        self._spawn_pipe(self.cfg.width + 80)
+        self._spawn_pipe(self.cfg.width + 80 + self.cfg.pipe_interval_px)
+        return self._obs(), {"score": self.score}
+
+    def step(self, action):
+        if action == 1:
+            self.vy = self.cfg.flap_impulse
+        self.vy += self.cfg.gravity
+        self.vy = max(self.cfg.vy_min, min(self.vy, self.cfg.vy_max))
+        self.y += self.vy
+
+        passed_reward = 0.0
+        new_pipes = []
+        for (x, gy) in self.pipes:
+            x2 = x - self.cfg.pipe_speed
+            if x + self.cfg.pipe_width >= self.cfg.player_x and x2 + self.cfg.pipe_width < self.cfg.player_x:
+                self.score += 1
+                passed_reward += 1.0
+            if x2 + self.cfg.pipe_width > 0:
+                new_pipes.append((x2, gy))
+        self.pipes = new_pipes
+
+        if len(self.pipes) == 0 or (self.pipes[-1][0] < self.cfg.width - self.cfg.pipe_interval_px):
+            self._spawn_pipe(self.cfg.width + 40)
+
+        done = False
+        reward = 0.1 + passed_reward
+
+        if self.y < 0 or self.y > self.cfg.height:
+            reward -= 1.0
+            done = True
+        else:
+            for (x, gy) in self.pipes:
+                if self.cfg.player_x + self.cfg.player_size > x and self.cfg.player_x < x + self.cfg.pipe_width:
+                    gap_top = gy - self.cfg.pipe_gap / 2
+                    gap_bottom = gy + self.cfg.pipe_gap / 2
+                    player_top = self.y - self.cfg.player_size / 2
+                    player_bottom = self.y + self.cfg.player_size / 2
+                    if player_top < gap_top or player_bottom > gap_bottom:
+                        reward -= 1.0
+                        done = True
+                        break
+
+        self.steps += 1
+        if self.steps >= self.cfg.max_steps:
+            done = True
+
+        return self._obs(), reward, done, {"score": self.score}
+
+    def _spawn_pipe(self, x):
+        margin = 90
+        gy = self.rng.randint(margin, self.cfg.height - margin)
+        self.pipes.append((x, float(gy)))
+
+    def _nearest_pipe(self):
+        candidates = [(x, gy) for (x, gy) in self.pipes if x + self.cfg.pipe_width >= self.cfg.player_x - 1]
+        if not candidates:
+            return float(self.cfg.width), self.cfg.height * 0.5
+        x, gy = min(candidates, key=lambda t: t[0])
+        dist_right = max(0.0, (x + self.cfg.pipe_width) - self.cfg.player_x)
+        return dist_right, gy
+
+    def _obs(self):
+        dist_right, gy = self._nearest_pipe()
+        y_norm = self.y / self.cfg.height
+        vy_norm = max(-1.0, min(1.0, self.vy / max(1e-6, self.cfg.vy_max)))
+        dist_norm = max(0.0, min(1.0, dist_right / self.cfg.width))
+        delta_gap_norm = max(-1.0, min(1.0, (gy - self.y) / self.cfg.height))
+        return np.array([y_norm, vy_norm, dist_norm, delta_gap_norm], dtype=np.float32)
+
+
+def _rate(n_steps: int, seconds: float) -> str:
+    return f"{n_steps / max(seconds, 1e-9):,.0f} steps/s"
+
+
+def _lockstep(vec: VecFlappyEnv, envs, steps: int, seed: int):
+    """Avança VecFlappyEnv e os FlappyEnv correspondentes com as mesmas ações e compara tudo."""
+    lanes = len(envs)
+    obs_v, _ = vec.reset()
+    obs_s = np.stack([e.reset()[0] for e in envs])
+    assert np.array_equal(obs_v, obs_s), "observação inicial diverge"
+    act_rng = np.random.default_rng(seed)
+    for t in range(steps):
+        # mistura expert e ações aleatórias para cobrir mortes e resets
+        acts = np.array([expert_action(o) for o in obs_s])
+        flip = act_rng.random(lanes) < 0.1
+        acts[flip] = 1 - acts[flip]
+        obs_v, r_v, d_v, info = vec.step(acts)
+        rows = []
+        for i, e in enumerate(envs):
+            o, r, d, inf = e.step(int(acts[i]))
+            assert r == r_v[i] and d == d_v[i] and inf["score"] == info["score"][i], f"pista {i} diverge no passo {t}"
+            # sem pistas encerradas não há terminal_obs: a observação final é a própria obs_v
+            assert np.array_equal(o, info.get("terminal_obs", obs_v)[i]), f"obs da pista {i} diverge no passo {t}"
+            if d:
+                o, _ = e.reset()
+            rows.append(o)
+        obs_s = np.stack(rows)
+        assert np.array_equal(obs_v, obs_s), f"obs pós-reset diverge no passo {t}"
+
+
+def check_vec_parity(lanes: int = 8, steps: int = 3000, seed: int = 42, frame_skip: int = 1):
+    """Compara VecFlappyEnv com `lanes` FlappyEnv escalares, passo a passo."""
+    vec = VecFlappyEnv(lanes, Config(seed=seed, frame_skip=frame_skip))
+    envs = [FlappyEnv(Config(seed=seed + i, frame_skip=frame_skip)) for i in range(lanes)]
+    _lockstep(vec, envs, steps, seed)
+    print(f"[paridade] VecFlappyEnv == FlappyEnv em {lanes} pistas x {steps} passos (frame_skip={frame_skip})")
+
+
+def check_lane_configs(steps: int = 2000, seed: int = 42):
+    """VecFlappyEnv.from_configs com física diferente por pista == FlappyEnv de cada Config."""
+    cfgs = [Config(pipe_gap=g, pipe_speed=sp, gravity=gr, flap_impulse=fl, seed=seed + i)
+            for i, (g, sp, gr, fl) in enumerate([(130, 3.0, 0.35, -7.0), (150, 2.5, 0.3, -6.5),
+                                                  (250, 3.5, 0.4, -7.5), (400, 3.0, 0.35, -7.0)])]
+    _lockstep(VecFlappyEnv.from_configs(cfgs), [FlappyEnv(c) for c in cfgs], steps, seed)
+    print(f"[paridade] VecFlappyEnv.from_configs == FlappyEnv em {len(cfgs)} configs x {steps} passos")
+
+
+def check_scalar_parity(steps: int = 20000, seed: int = 42):
+    """FlappyEnv (ring buffer, out=) deve ser bit-idêntico à implementação original."""
+    for gap in (130, 150, 250):
+        new, old = FlappyEnv(Config(pipe_gap=gap, seed=seed)), LegacyFlappyEnv(Config(pipe_gap=gap, seed=seed))
+        buf = np.empty(4, dtype=np.float32)
+        o_new, _ = new.reset(out=buf)
+        o_old, _ = old.reset()
+        act_rng = np.random.default_rng(seed)
+        for t in range(steps):
+            a = expert_action(o_old)
+            if act_rng.random() < 0.05:
+                a = 1 - a
+            o_new, r_new, d_new, i_new = new.step(a, out=buf)
+            o_old, r_old, d_old, i_old = old.step(a)
+            assert np.array_equal(o_new, o_old) and r_new == r_old and d_new == d_old and i_new == i_old, \
+                f"gap={gap}: diverge no passo {t}"
+            assert new.pipes == old.pipes, f"gap={gap}: canos divergem no passo {t}"
+            if d_new:
+                o_new, _ = new.reset(out=buf)
+                o_old, _ = old.reset()
+    print(f"[paridade] FlappyEnv == implementação original em {steps} passos x 3 gaps")
+
+
+def bench_scalar_env(steps: int, seed: int):
+    check_scalar_parity(seed=seed)
+    acts = (np.random.default_rng(seed).random(steps) < 0.08).astype(int).tolist()
+    results = {}
+    for name, env, kwargs in (("original", LegacyFlappyEnv(Config(seed=seed)), {}),
+                              ("FlappyEnv", FlappyEnv(Config(seed=seed)), {}),
+                              ("FlappyEnv(out=)", FlappyEnv(Config(seed=seed)), {"out": np.empty(4, dtype=np.float32)})):
+        env.reset(**kwargs)
+        t0 = time.perf_counter()
+        for a in acts:
+            if env.step(a, **kwargs)[2]:
+                env.reset(**kwargs)
+        results[name] = time.perf_counter() - t0
+    base = steps / results["original"]
+    for name, dt in results.items():
+        print(f"{name:<16} {_rate(steps, dt)}  ({steps / dt / base:.2f}x)")
+
+
+def check_snapshot(seed: int = 42, horizon: int = 300):
+    """Um rollout a partir de set_state()/clone() repete exatamente o original."""
+    env = FlappyEnv(Config(seed=seed))
+    obs, _ = env.reset()
+    for _ in range(500):
+        obs, _, done, _ = env.step(expert_action(obs))
+        if done:
+            obs, _ = env.reset()
+    state = env.get_state()
+    branch = env.clone()
+
+    def rollout(e, o):
+        trace = []
+        for _ in range(horizon):
+            o, r, d, info = e.step(expert_action(o))
+            trace.append((o.tobytes(), r, d, info["score"]))
+            if d:
+                o, _ = e.reset()
+        return trace
+
+    ref = rollout(env, obs)
+    assert rollout(branch, obs) == ref, "clone() diverge do original"
+    env.set_state(state)
+    assert rollout(env, obs) == ref, "set_state() não reproduz o rollout"
+    print(f"[paridade] clone()/set_state() reproduzem {horizon} passos (com resets)")
+
+
+def bench_clone(reps: int, seed: int):
+    check_snapshot(seed=seed)
+    env = FlappyEnv(Config(seed=seed))
+    env.reset()
+    for _ in range(100):
+        env.step(0)
+    state = env.get_state()
+    timings = {}
+    for name, fn, n in (("copy.deepcopy(env)", lambda: copy.deepcopy(env), max(1, reps // 10)),
+                        ("env.clone()", env.clone, reps),
+                        ("env.get_state()", env.get_state, reps),
+                        ("env.set_state(s)", lambda: env.set_state(state), reps)):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        timings[name] = (time.perf_counter() - t0) / n
+    base = timings["copy.deepcopy(env)"]
+    for name, dt in timings.items():
+        print(f"{name:<20} {dt * 1e6:8.2f} us  ({base / dt:.0f}x)")
+
+
+def bench_startup(reps: int):
+    """Tempo de subir um processo que importa game_env, com e sem carregar o pygame."""
+    cases = (("import game_env (lazy)", "import game_env"),
+             ("import game_env + pygame (eager)", "import game_env; game_env._load_pygame()"))
+    for name, code in cases:
+        times = []
+        for _ in range(reps):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - t0)
+        print(f"{name:<34} mediana {statistics.median(times) * 1e3:7.1f} ms")
+    if _load_pygame() is None:
+        print("(pygame não instalado: a diferença aqui é só o custo da tentativa de import)")
+
+
+def check_step_n(seed: int = 42, k: int = 3, steps: int = 5000):
+    """step_n(a, k) == step(a) seguido de k-1 step(0), somando recompensas."""
+    a_env, b_env = FlappyEnv(Config(seed=seed)), FlappyEnv(Config(seed=seed))
+    obs, _ = a_env.reset()
+    b_env.reset()
+    for t in range(steps):
+        act = expert_action(obs)
+        obs, r_a, d_a, i_a = a_env.step_n(act, k)
+        o_b, r_b, d_b, i_b = b_env.step(act)
+        for _ in range(k - 1):
+            if d_b:
+                break
+            o_b, r, d_b, i_b = b_env.step(0)
+            r_b += r
+        assert np.array_equal(obs, o_b) and r_a == r_b and d_a == d_b and i_a == i_b, f"step_n diverge na decisão {t}"
+        if d_a:
+            obs, _ = a_env.reset()
+            b_env.reset()
+    print(f"[paridade] step_n(a, {k}) == step(a) + {k - 1}x step(0)")
+
+
+def bench_frame_skip(ticks: int, seed: int):
+    check_step_n(seed=seed)
+    for k in (2, 4):
+        check_vec_parity(steps=1000, seed=seed, frame_skip=k)
+    base = None
+    for k in (1, 2, 3, 4):
+        env = FlappyEnv(Config(seed=seed, frame_skip=k))
+        obs, _ = env.reset()
+        decisions = 0
+        t0 = time.perf_counter()
+        while decisions * k < ticks:
+            obs, _, done, _ = env.step(expert_action(obs))
+            decisions += 1
+            if done:
+                obs, _ = env.reset()
+        dt = time.perf_counter() - t0
+        base = base or dt
+        print(f"frame_skip={k}: {_rate(ticks, dt)} de física, {decisions / dt:,.0f} decisões/s  ({base / dt:.2f}x)")
+
+
+def check_course(seed: int = 42, episodes: int = 5):
+    """A linha e do CourseTable reproduz o episódio FlappyEnv.reset(seed=env_seeds(seed, [e])[0])."""
+    cfg = Config(seed=seed, max_steps=3000)
+    course = CourseTable.generate(seed, episodes, cfg)
+    with_table, with_rng = FlappyEnv(cfg, course=course), FlappyEnv(cfg)
+    for e, s in enumerate(env_seeds(seed, range(episodes))):
+        o_a, _ = with_table.reset()
+        o_b, _ = with_rng.reset(seed=s)
+        done = False
+        while not done:
+            a = expert_action(o_a)
+            o_a, r_a, done, _ = with_table.step(a)
+            o_b, r_b, d_b, _ = with_rng.step(a)
+            assert np.array_equal(o_a, o_b) and r_a == r_b and done == d_b, f"episódio {e} diverge"
+    vec = VecFlappyEnv(episodes, cfg, course=course)
+    obs_v, _ = vec.reset()
+    for e in range(episodes):
+        assert vec.pipe_gy[e, :2].tolist() == list(course.row(e)[:2]), f"pista {e} não usa a linha {e}"
+    print(f"[paridade] CourseTable reproduz {episodes} episódios sorteados por seed")
+
+
+def _linear_policy(path: str):
+    pack = np.load(path, allow_pickle=True).item()
+    w = np.asarray(pack["w"], dtype=np.float64).reshape(-1)
+    b = float(pack["b"])
+    mean = np.asarray(pack["mean"]).reshape(-1)
+    std = np.asarray(pack["std"]).reshape(-1) + 1e-6
+    return lambda obs: int(((obs - mean) / std) @ w + b >= 0.0)
+
+
+def bench_course(episodes: int, seed: int, models):
+    check_course(seed=seed)
+    cfg = Config(pipe_gap=400, seed=seed, max_steps=2000)
+    t0 = time.perf_counter()
+    course = CourseTable.load(seed, episodes, cfg)
+    print(f"CourseTable.load({episodes} episódios): {(time.perf_counter() - t0) * 1e3:.1f} ms ({course.gaps.nbytes} bytes)")
+
+    def scores(policy, course=None, master=None):
+        env = FlappyEnv(cfg, course=course)
+        out = []
+        for s in env_seeds(master, range(episodes)) if course is None else [None] * episodes:
+            obs, _ = env.reset(seed=s)
+            done = False
+            while not done:
+                obs, _, done, info = env.step(policy(obs))
+            out.append(env.steps)
+        return np.array(out, dtype=np.float64)
+
+    a, b = (_linear_policy(m) for m in models)
+    t0 = time.perf_counter()
+    paired = scores(a, course) - scores(b, course)
+    t_course = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    unpaired = scores(a, master=seed) - scores(b, master=seed + 1)
+    t_rng = time.perf_counter() - t0
+    print(f"passos sobrevividos, {models[0]} - {models[1]} em {episodes} episódios:")
+    print(f"  percurso comum:      diff={paired.mean():+.2f}  desvio={paired.std():.2f}  ({t_course:.2f}s)")
+    print(f"  seeds independentes: diff={unpaired.mean():+.2f}  desvio={unpaired.std():.2f}  ({t_rng:.2f}s)")
+
+
+def _random_obs(n: int, seed: int) -> np.ndarray:
+    """Observações aleatórias cobrindo as faixas das features, com parte nos limiares exatos."""
+    rng = np.random.default_rng(seed)
+    obs = np.empty((n, 4), dtype=np.float32)
+    obs[:, 0] = rng.uniform(-0.1, 1.1, n)
+    obs[:, 1] = rng.uniform(-1.0, 1.0, n)
+    obs[:, 2] = rng.uniform(0.0, 1.0, n)
+    obs[:, 3] = rng.uniform(-1.0, 1.0, n)
+    thresholds = [np.array(v, dtype=np.float32) for v in
+                  ([0.1, 0.9, 0.7, 0.25, 0.3], [-0.4, 0.0, 0.5], [0.9], [0.3, -0.2, 0.0])]
+    k = n // 4
+    for col, vals in enumerate(thresholds):
+        rows = rng.integers(0, n, k)
+        obs[rows, col] = rng.choice(vals, k)
+    return obs
+
+
+def check_expert_batch(n: int, seed: int = 0):
+    obs = _random_obs(n, seed)
+    ref = np.fromiter((expert_action(o) for o in obs), dtype=np.int64, count=n)
+    got = expert_action_batch(obs)
+    bad = np.flatnonzero(ref != got)
+    assert bad.size == 0, f"{bad.size} divergências, ex.: {obs[bad[0]]} ref={ref[bad[0]]} batch={got[bad[0]]}"
+    print(f"[paridade] expert_action_batch == expert_action em {n:,} observações")
+
+
+def bench_expert_batch(n: int, seed: int):
+    check_expert_batch(n, seed)
+    obs = _random_obs(n, seed + 1)
+    n_scalar = min(n, 200000)
+    t0 = time.perf_counter()
+    for o in obs[:n_scalar]:
+        expert_action(o)
+    t_scalar = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    expert_action_batch(obs)
+    t_batch = time.perf_counter() - t0
+    r_scalar, r_batch = n_scalar / t_scalar, n / t_batch
+    print(f"expert_action (loop):  {r_scalar:,.0f} obs/s")
+    print(f"expert_action_batch:   {r_batch:,.0f} obs/s  ({r_batch / r_scalar:.0f}x)")
+
+
+def bench_expert_table(n: int, bins: int, seed: int):
+    from expert_table import ExpertTable
+    t0 = time.perf_counter()
+    table = ExpertTable.compile((bins,) * 4)
+    print(f"compilação {bins}^4: {time.perf_counter() - t0:.2f}s, {table.codes.nbytes / 2**20:.1f} MiB")
+    obs = _random_obs(n, seed)
+    ref = expert_action_batch(obs)
+    assert np.array_equal(table.label(obs), ref), "label() diverge de expert_action"
+    print(f"[paridade] ExpertTable.label == expert_action em {n:,} observações")
+    rep = table.report(obs)
+    print(f"fallback={rep['fallback_rate']:.4f}  mismatch só tabela={rep['mismatch_rate_table_only']:.4f}")
+    for name, fn in (("expert_action_batch", expert_action_batch),
+                     ("ExpertTable.label", table.label),
+                     ("ExpertTable.label_fast", table.label_fast)):
+        t0 = time.perf_counter()
+        fn(obs)
+        print(f"{name:<24} {n / (time.perf_counter() - t0):,.0f} obs/s")
+
+
+def bench_dataset_io(csv_path: str, rows: int):
+    import os
+    import tempfile
+    import dataset_io
+    with tempfile.TemporaryDirectory() as tmp:
+        fds = os.path.join(tmp, "data.fds")
+        dataset_io.convert_csv(csv_path, fds)
+        for name, path in (("CSV (pandas)", csv_path), (".fds (memmap)", fds)):
+            t0 = time.perf_counter()
+            X, y = dataset_io.load_xy(path)
+            X = np.array(X)   # força a leitura das páginas
+            print(f"load_xy {name:<14} {(time.perf_counter() - t0) * 1e3:8.1f} ms  ({len(X)} linhas)")
+
+        obs = _random_obs(rows, 0)
+        acts = (obs[:, 0] > 0.5).astype(np.int64).tolist()
+        for name, path in (("CsvWriter", os.path.join(tmp, "w.csv")), ("DatasetWriter", os.path.join(tmp, "w.fds"))):
+            t0 = time.perf_counter()
+            with dataset_io.open_writer(path) as wr:
+                for o, a in zip(obs, acts):
+                    wr.append(o, a, 0.1, False, 0)
+            print(f"append {name:<15} {rows / (time.perf_counter() - t0):,.0f} linhas/s")
+
+
+def bench_coreset(csv_path: str, epochs: int, seed: int):
+    """Compressão do coreset vs acurácia (em linhas brutas de teste) e tempo de treino."""
+    import dataset_io
+    from run_experiments import train_logreg_numpy, sigmoid
+    X, y = dataset_io.load_xy(csv_path)
+    perm = np.random.default_rng(seed).permutation(len(X))
+    cut = int(0.8 * len(X))
+    Xtr, ytr, Xte, yte = X[perm[:cut]], y[perm[:cut]], X[perm[cut:]], y[perm[cut:]]
+
+    def test_acc(w, b, mean, std):
+        return np.mean((sigmoid(((Xte - mean) / std) @ w + b).ravel() >= 0.5) == yte)
+
+    t0 = time.perf_counter()
+    base = test_acc(*train_logreg_numpy(Xtr, ytr, epochs=epochs, seed=seed)[:4])
+    t_base = time.perf_counter() - t0
+    print(f"{'modo':<12} {'linhas':>8} {'compressão':>10} {'acc teste':>10} {'delta':>8} {'treino':>8}")
+    print(f"{'completo':<12} {len(Xtr):>8} {1.0:>9.1f}x {base:>10.4f} {0.0:>+8.4f} {t_base:>7.3f}s")
+    for bins in (None, 64, 32, 16):
+        Xc, yc, wc = dataset_io.compact(Xtr, ytr, bins=bins)
+        t0 = time.perf_counter()
+        acc = test_acc(*train_logreg_numpy(Xc, yc.astype(np.float32), epochs=epochs, seed=seed, sample_weight=wc)[:4])
+        dt = time.perf_counter() - t0
+        name = "exato" if bins is None else f"grade {bins}"
+        print(f"{name:<12} {len(Xc):>8} {len(Xtr) / len(Xc):>9.1f}x {acc:>10.4f} {acc - base:>+8.4f} {dt:>7.3f}s")
+
+
+def _peak_rss_mb() -> float:
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_stream_train(csv_path: str, rows: int, chunk_rows: int, epochs: int, seed: int):
+    """Treino em pedaços (stream_train) num .fds sintético de `rows` linhas: memória de pico e vazão."""
+    import os
+    import tempfile
+    import dataset_io
+    from stream_train import train_stream
+    X0, y0 = dataset_io.load_xy(csv_path)
+    X0, y0 = np.asarray(X0), np.asarray(y0)
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.fds")
+        with dataset_io.DatasetWriter(path, extras=()) as wr:
+            while wr.rows < rows:
+                idx = rng.integers(0, len(X0), min(chunk_rows, rows - wr.rows))
+                wr.append_batch(X0[idx] + rng.normal(0, 0.01, (len(idx), X0.shape[1])).astype(np.float32), y0[idx])
+        size_mb = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+        rss0 = _peak_rss_mb()
+        t0 = time.perf_counter()
+        pack = train_stream(path, epochs=epochs, lr=0.01, chunk_rows=chunk_rows, seed=seed)
+        dt = time.perf_counter() - t0
+        print(f"dataset: {rows:,} linhas, {size_mb:,.0f} MB em disco (carregado inteiro: ~{rows * 20 / 1e6:,.0f} MB)")
+        print(f"pico de RSS: {rss0:,.0f} MB antes do treino -> {_peak_rss_mb():,.0f} MB depois "
+              f"(pedaço = {chunk_rows:,} linhas)")
+        print(f"treino: {dt:.1f}s para {epochs} época(s) (+1 passada de estatísticas), "
+              f"{rows * epochs / dt:,.0f} linhas/s | w={pack['w'].ravel().round(3)} b={pack['b']:.3f}")
+
+
+def bench_solvers(csv_path: str, seed: int, reps: int):
+    """GD de passo fixo vs Newton/L-BFGS (train_logreg_numpy): tempo, passadas, loss de treino e acurácia."""
+    import dataset_io
+    import logreg
+    from run_experiments import train_logreg_numpy, poly_features
+    X0, y = dataset_io.load_xy(csv_path)
+    X0 = np.asarray(X0)
+    runs = [("gd", 0.05, 60), ("gd", 0.1, 100), ("gd", 0.1, 1000), ("newton", None, None), ("lbfgs", None, None)]
+    for poly in (1, 2):
+        X = X0 if poly == 1 else poly_features(X0, degree=2)
+        tr = np.random.default_rng(seed).permutation(len(X))[:int(0.8 * len(X))]   # mesmo split do trainer
+        print(f"\npoly={poly} ({X.shape[1]} features, {len(tr)} linhas de treino)")
+        print(f"{'solver':<18} {'tempo':>9} {'passadas':>9} {'loss':>8} {'acc_va':>7}")
+        for solver, lr, epochs in runs:
+            t0 = time.perf_counter()
+            for _ in range(reps):
+                w, b, mean, std, acc = train_logreg_numpy(X, y, lr=lr, epochs=epochs, seed=seed, solver=solver,
+                                                          max_iter=1000)
+            dt = (time.perf_counter() - t0) / reps
+            f = logreg._Objective((X[tr] - mean) / std, y[tr])
+            loss = f.loss_grad(np.append(w.ravel(), b))[0]
+            passes = epochs if solver == "gd" else logreg.fit(f.X, f.y, solver, max_iter=1000)[2]["passes"]
+            name = solver if solver != "gd" else f"gd lr={lr} ep={epochs}"
+            print(f"{name:<18} {dt * 1e3:>7.1f}ms {passes:>9} {loss:>8.4f} {acc:>7.4f}")
+
+
+def bench_grid_train(csv_path: str, seed: int, reps: int):
+    """Sub-grid lr x epochs: um train_logreg_numpy por par vs um train_logreg_grid."""
+    import dataset_io
+    from run_experiments import train_logreg_numpy, train_logreg_grid, poly_features
+    X0, y = dataset_io.load_xy(csv_path)
+    X0 = np.asarray(X0)
+    lrs, epochs = [0.05, 0.1], [60, 100]
+    for poly in (1, 2):
+        X = X0 if poly == 1 else poly_features(X0, degree=2)
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            single = {(lr, ep): train_logreg_numpy(X, y, lr, ep, seed=seed) for lr in lrs for ep in epochs}
+        t_single = (time.perf_counter() - t0) / reps
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            grid = train_logreg_grid(X, y, lrs, epochs, seed=seed)
+        t_grid = (time.perf_counter() - t0) / reps
+        dw = max(float(np.abs(grid[k][0] - single[k][0]).max()) for k in single)
+        dacc = max(abs(grid[k][4] - single[k][4]) for k in single)
+        print(f"poly={poly}: {len(single)} treinos {t_single * 1e3:7.1f}ms | lote {t_grid * 1e3:7.1f}ms "
+              f"({t_single / t_grid:.1f}x) | max|dw|={dw:.1e} max|dacc|={dacc:.1e}")
+
+
+def _legacy_gd(X, y, lr, epochs, seed):
+    """Laço de treino original do train_logreg.py (cópias Xn/Xtr, loss em toda época)."""
+    mean = X.mean(axis=0, keepdims=True)
+    std = X.std(axis=0, keepdims=True) + 1e-6
+    Xn = (X - mean) / std
+    idx = np.random.default_rng(seed).permutation(len(Xn))
+    tr = idx[:int(0.8 * len(Xn))]
+    Xtr, ytr = Xn[tr], y[tr].reshape(-1, 1)
+    w = np.zeros((Xtr.shape[1], 1), dtype=np.float32)
+    b = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(Xtr @ w + b)))
+        loss = np.mean(-(ytr * np.log(p + 1e-8) + (1 - ytr) * np.log(1 - p + 1e-8)))
+        dz = (p - ytr) / len(Xtr)
+        w -= lr * (Xtr.T @ dz)
+        b -= lr * dz.sum()
+    return w, b, loss
+
+
+def _core_gd(X, y, lr, epochs, seed):
+    """Mesmo treino com _prepare (uma cópia) + logreg.GDTrainer; loss só na última época."""
+    import logreg
+    from run_experiments import _prepare
+    Xtr, ytr = _prepare(X, y, seed)[:2]
+    trainer = logreg.GDTrainer(Xtr, ytr)
+    for ep in range(1, epochs + 1):
+        loss = trainer.step(lr, with_loss=ep == epochs)
+    w, b = trainer.weights()
+    return w, b, loss
+
+
+def _stream_gd(X, y, lr, epochs, seed):
+    """GDTrainer padronizando por bloco sobre X cru (estatísticas Welford, split por máscara)."""
+    import logreg
+    from run_experiments import _stats, _split
+    mean, std = _stats(X)
+    idx, cut = _split(len(X), seed)
+    train = np.zeros(len(X), dtype=bool)
+    train[idx[:cut]] = True
+    trainer = logreg.GDTrainer(X, y, mean=mean, std=std, mask=train)
+    for ep in range(1, epochs + 1):
+        loss = trainer.step(lr, with_loss=ep == epochs)
+    w, b = trainer.weights()
+    return w, b, loss
+
+
+def bench_train_core(csv_path: str, rows: int, epochs: int, seed: int):
+    """
+    Laço GD original vs GDTrainer (cópia padronizada única) vs GDTrainer por blocos
+    (sem cópia): pico de memória (tracemalloc), tempo por época e paridade.
+    """
+    import tracemalloc
+    import dataset_io
+    X0, y0 = dataset_io.load_xy(csv_path)
+    idx = np.random.default_rng(seed).integers(0, len(X0), rows)
+    X, y = np.asarray(X0)[idx], np.asarray(y0)[idx]
+    data_mb = (X.nbytes + y.nbytes) / 1e6
+    res = {}
+    for name, fn in (("original", _legacy_gd), ("GDTrainer", _core_gd), ("blocos", _stream_gd)):
+        fn(X[:1000], y[:1000], 0.1, 2, seed)   # aquece imports/BLAS
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        res[name] = fn(X, y, 0.1, epochs, seed)
+        dt = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        print(f"{name:<10} pico {peak:8.1f} MB além dos dados ({data_mb:.0f} MB) | "
+              f"{dt / epochs * 1e3:7.1f} ms/época (com preparo) | loss final {res[name][2]:.5f}")
+    w0, b0, _ = res["original"]
+    for name in ("GDTrainer", "blocos"):
+        w1, b1, _ = res[name]
+        print(f"{name} vs original: max|dw|={np.abs(w0 - w1).max():.1e} |db|={abs(b0 - b1):.1e}")
+
+
+def bench_data_parallel(csv_path: str, rows: int, epochs: int, workers, seed: int):
+    """
+    GD data-parallel (parallel_train.ParallelGD) vs GDTrainer num processo: tempo por
+    época com 1..N workers e paridade dos pesos (a soma por shards só muda a ordem das somas).
+    """
+    import os
+    import logreg
+    import dataset_io
+    from parallel_train import ParallelGD
+    from run_experiments import _stats, _split
+    X0, y0 = dataset_io.load_xy(csv_path)
+    idx = np.random.default_rng(seed).integers(0, len(X0), rows)
+    X, y = np.ascontiguousarray(np.asarray(X0)[idx], dtype=np.float32), np.asarray(y0)[idx].astype(np.float32)
+    mean, std = _stats(X)
+    perm, cut = _split(len(X), seed)
+    train = np.zeros(len(X), dtype=bool)
+    train[perm[:cut]] = True
+    print(f"{rows} linhas, {epochs} épocas, {os.cpu_count()} CPUs visíveis")
+
+    ref = logreg.GDTrainer(X, y, mean=mean, std=std, mask=train)
+    t0 = time.perf_counter()
+    for ep in range(1, epochs + 1):
+        loss0 = ref.step(0.1, with_loss=ep == epochs)
+    t_ref = (time.perf_counter() - t0) / epochs
+    w0, b0 = ref.weights()
+    print(f"{'GDTrainer':<12} {t_ref * 1e3:8.1f} ms/época | loss {loss0:.5f}")
+    for k in workers:
+        with ParallelGD(X, y, mean=mean, std=std, mask=train, workers=k) as par:
+            par.step(0.0)   # sobe o pool e monta os GDTrainer dos shards
+            par.local.w[:] = 0.0
+            par.local.b = np.float32(0.0)
+            t0 = time.perf_counter()
+            for ep in range(1, epochs + 1):
+                loss = par.step(0.1, with_loss=ep == epochs)
+            dt = (time.perf_counter() - t0) / epochs
+            w, b = par.weights()
+        print(f"{f'{k} workers':<12} {dt * 1e3:8.1f} ms/época ({t_ref / dt:.2f}x) | loss {loss:.5f} | "
+              f"max|dw|={np.abs(w - w0).max():.1e} |db|={abs(b - b0):.1e}")
+
+
+def bench_cross_val(csv_path: str, folds: int, workers: int, seed: int):
+    """k-fold de um grupo lr x epochs: um treino 80/20 vs folds em série vs folds em paralelo."""
+    import os
+    import dataset_io
+    from run_experiments import cross_validate, train_logreg_grid
+    X, y = dataset_io.load_xy(csv_path)
+    X, y = np.asarray(X), np.asarray(y, dtype=np.float32)
+    lrs, epochs = [0.05, 0.1], [60, 100]
+    print(f"{len(X)} linhas, {folds} folds, {os.cpu_count()} CPUs visíveis")
+    t0 = time.perf_counter()
+    single = train_logreg_grid(X, y, lrs, epochs, seed=seed)
+    t_single = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    serial = cross_validate(X, y, lrs, epochs, seed=seed, folds=folds, workers=1)
+    t_serial = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    par = cross_validate(X, y, lrs, epochs, seed=seed, folds=folds, workers=workers)
+    t_par = time.perf_counter() - t0
+    print(f"um treino 80/20 {t_single:6.2f}s | {folds} folds em série {t_serial:6.2f}s | "
+          f"{workers} workers {t_par:6.2f}s ({t_par / t_single:.1f}x um treino)")
+    for key in single:
+        assert serial[key][4:] == par[key][4:], key
+        print(f"lr={key[0]} epc={key[1]}: 80/20 {single[key][4]:.4f} | "
+              f"k-fold {par[key][4]:.4f} ± {par[key][5]:.4f}")
+
+
+def bench_vec_env(lanes: int, steps: int, seed: int):
+    check_vec_parity(seed=seed)
+    check_lane_configs(seed=seed)
+    acts_rng = np.random.default_rng(seed)
+    acts = (acts_rng.random((steps, lanes)) < 0.08).astype(np.int64)
+
+    envs = [FlappyEnv(Config(seed=seed + i)) for i in range(lanes)]
+    for e in envs:
+        e.reset()
+    scalar_steps = max(1, steps // 10)
+    t0 = time.perf_counter()
+    for t in range(scalar_steps):
+        for i, e in enumerate(envs):
+            _, _, d, _ = e.step(int(acts[t, i]))
+            if d:
+                e.reset()
+    t_scalar = time.perf_counter() - t0
+
+    vec = VecFlappyEnv(lanes, Config(seed=seed))
+    vec.reset()
+    t0 = time.perf_counter()
+    for t in range(steps):
+        vec.step(acts[t])
+    t_vec = time.perf_counter() - t0
+
+    r_scalar = scalar_steps * lanes / t_scalar
+    r_vec = steps * lanes / t_vec
+    print(f"FlappyEnv x{lanes}:    {_rate(scalar_steps * lanes, t_scalar)}")
+    print(f"VecFlappyEnv({lanes}): {_rate(steps * lanes, t_vec)}  ({r_vec / r_scalar:.1f}x)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("vec_env", help="VecFlappyEnv vs N FlappyEnv")
+    p.add_argument("--lanes", type=int, default=1024)
+    p.add_argument("--steps", type=int, default=2000)
+    p.add_argument("--seed", type=int, default=42)
+    p = sub.add_parser("scalar_env", help="FlappyEnv vs implementação original")
+    p.add_argument("--steps", type=int, default=200000)
+    p.add_argument("--seed", type=int, default=42)
+    p = sub.add_parser("clone", help="clone()/get_state() vs copy.deepcopy")
+    p.add_argument("--reps", type=int, default=20000)
+    p.add_argument("--seed", type=int, default=42)
+    p = sub.add_parser("startup", help="tempo de início de processo (pygame lazy vs eager)")
+    p.add_argument("--reps", type=int, default=20)
+    p = sub.add_parser("frame_skip", help="custo por tick com expert decidindo a cada k ticks")
+    p.add_argument("--ticks", type=int, default=100000)
+    p.add_argument("--seed", type=int, default=42)
+    p = sub.add_parser("course", help="CourseTable: paridade e variância com percurso comum")
+    p.add_argument("--episodes", type=int, default=40)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--models", nargs=2, default=["runs/run_1_weights.npy", "runs/run_3_weights.npy"])
+    p = sub.add_parser("expert_batch", help="expert_action_batch vs loop de expert_action")
+    p.add_argument("--n", type=int, default=2000000)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("expert_table", help="ExpertTable (lookup) vs expert_action_batch")
+    p.add_argument("--n", type=int, default=2000000)
+    p.add_argument("--bins", type=int, default=64)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("dataset_io", help="CSV vs .fds: leitura e escrita por linha")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--rows", type=int, default=200000)
+    p = sub.add_parser("coreset", help="coreset ponderado: compressão vs acurácia")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--epochs", type=int, default=100)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("stream_train", help="SGD out-of-core: memória de pico num dataset grande")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--rows", type=int, default=20000000)
+    p.add_argument("--chunk_rows", type=int, default=1 << 20)
+    p.add_argument("--epochs", type=int, default=1)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("solvers", help="GD vs Newton/L-BFGS na regressão logística")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--reps", type=int, default=3)
+    p = sub.add_parser("grid_train", help="sub-grid lr x epochs: treinos separados vs W (d,K) em lote")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--reps", type=int, default=3)
+    p = sub.add_parser("train_core", help="laço GD original vs GDTrainer sem alocações")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--rows", type=int, default=2000000)
+    p.add_argument("--epochs", type=int, default=20)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("data_parallel", help="gradiente do GD somado entre processos (shared_memory)")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--rows", type=int, default=8000000)
+    p.add_argument("--epochs", type=int, default=10)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("cross_val", help="k-fold: folds em série vs em paralelo sobre shared_memory")
+    p.add_argument("--csv", type=str, default="data_final.csv")
+    p.add_argument("--folds", type=int, default=5)
+    p.add_argument("--workers", type=int, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.cmd == "vec_env":
+        bench_vec_env(args.lanes, args.steps, args.seed)
+    elif args.cmd == "scalar_env":
+        bench_scalar_env(args.steps, args.seed)
+    elif args.cmd == "clone":
+        bench_clone(args.reps, args.seed)
+    elif args.cmd == "startup":
+        bench_startup(args.reps)
+    elif args.cmd == "frame_skip":
+        bench_frame_skip(args.ticks, args.seed)
+    elif args.cmd == "course":
+        bench_course(args.episodes, args.seed, args.models)
+    elif args.cmd == "expert_batch":
+        bench_expert_batch(args.n, args.seed)
+    elif args.cmd == "expert_table":
+        bench_expert_table(args.n, args.bins, args.seed)
+    elif args.cmd == "dataset_io":
+        bench_dataset_io(args.csv, args.rows)
+    elif args.cmd == "coreset":
+        bench_coreset(args.csv, args.epochs, args.seed)
+    elif args.cmd == "stream_train":
+        bench_stream_train(args.csv, args.rows, args.chunk_rows, args.epochs, args.seed)
+    elif args.cmd == "solvers":
+        bench_solvers(args.csv, args.seed, args.reps)
+    elif args.cmd == "grid_train":
+        bench_grid_train(args.csv, args.seed, args.reps)
+    elif args.cmd == "train_core":
+        bench_train_core(args.csv, args.rows, args.epochs, args.seed)
+    elif args.cmd == "data_parallel":
+        bench_data_parallel(args.csv, args.rows, args.epochs, args.workers, args.seed)
+    elif args.cmd == "cross_val":
+        bench_cross_val(args.csv, args.folds, args.workers, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,126 @@
 import argparse
-import csv
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from game_env import FlappyEnv, Config
 from expert_policy import expert_action
-import numpy as np
-import random
+from seeding import episode_rngs
+import dataset_io
+
+def collect_episodes(ep_start, ep_stop, out, gap=150, epsilon=0.0, seed=42, render_every=0, verbose=True):
+    """
+    Coleta os episódios [ep_start, ep_stop) em `out`. Cada episódio usa o próprio
+    fluxo de seeding.episode_rngs(seed, ep), então o resultado não depende de quem
+    (ou quantos processos) coletou os outros episódios.
+    """
+    env = FlappyEnv(Config(pipe_gap=gap, seed=seed))
+    scores = []
+    stats = dataset_io.RunningStats()   # estatísticas das features, unidas entre shards no fim
+    with dataset_io.open_writer(out) as wr:
+        for ep in range(ep_start, ep_stop):
+            env_seed, noise = episode_rngs(seed, ep)
+            obs, _ = env.reset(seed=env_seed)
+            done = False
+            ep_obs = []
+            while not done:
+                a = expert_action(obs)
+                if noise.random() < epsilon:
+                    a = int(noise.integers(0, 2))
+                next_obs, r, done, info = env.step(a)
+                wr.append(obs, a, r, done, ep)
+                ep_obs.append(obs)
+                obs = next_obs
+                if render_every and (ep % render_every == 0):
+                    env.render()
+            stats.update(np.array(ep_obs, dtype=np.float32))
+            scores.append(info.get("score", 0))
+            if verbose:
+                print(f"[coleta] ep {ep+1}/{ep_stop} score={scores[-1]}")
+        rows = wr.rows
+    return {"path": out, "episodes": [ep_start, ep_stop], "rows": rows, "scores": scores,
+            "stats": stats.to_dict()}
+
+def _shard_path(out, i):
+    stem, ext = os.path.splitext(out.rstrip("/\\"))
+    return f"{stem}.shard{i:03d}{ext}"
+
+def _collect_shard(job):
+    return collect_episodes(**job, verbose=False)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--episodes", type=int, default=50)
-    ap.add_argument("--out", type=str, default="data.csv")
+    ap.add_argument("--out", type=str, default="data.csv", help="*.csv ou *.fds (binário colunar, ver dataset_io)")
     ap.add_argument("--gap", type=int, default=150, help="pipe gap (dificuldade)")
     ap.add_argument("--epsilon", type=float, default=0.0, help="prob. de ação aleatória (ruído)")
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--render_every", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1, help="processos; cada um grava seu shard")
+    ap.add_argument("--no_merge", action="store_true", help="com --workers > 1, mantém só os shards")
+    ap.add_argument("--store", type=str, default=None,
+                    help="anexa os episódios a um store .fds indexado (dataset_io.DatasetStore) em vez de gravar --out")
+    ap.add_argument("--ep_start", type=int, default=0, help="primeiro índice de episódio (continuar uma coleta)")
     args = ap.parse_args()
 
-    random.seed(args.seed); np.random.seed(args.seed)
+    params = {"gap": args.gap, "epsilon": args.epsilon, "seed": args.seed}
+    if args.store:
+        store = dataset_io.DatasetStore(args.store)
+        args.out = os.path.join(args.store, "incoming.fds")
+        args.no_merge = True
+    ep_stop = args.ep_start + args.episodes
+    if args.workers <= 1:
+        try:
+            shards = [collect_episodes(args.ep_start, ep_stop, args.out, render_every=args.render_every, **params)]
+        except SystemExit:
+            return
+    else:
+        if args.render_every:
+            raise ValueError("--render_every não funciona com --workers > 1")
+        bounds = np.linspace(args.ep_start, ep_stop, args.workers + 1).astype(int)
+        jobs = [dict(ep_start=int(a), ep_stop=int(b), out=_shard_path(args.out, i), **params)
+                for i, (a, b) in enumerate(zip(bounds[:-1], bounds[1:])) if b > a]
+        with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+            shards = list(pool.map(_collect_shard, jobs))
+        for sh in shards:
+            print(f"[coleta] shard {sh['path']}: episódios {sh['episodes']} linhas={sh['rows']}")
+        if not args.no_merge and dataset_io.is_fds(args.out):
+            dataset_io.concat([sh["path"] for sh in shards], args.out)
+        elif not args.no_merge:
+            # shards são faixas contíguas de episódios: concatenar em ordem = coleta serial
+            with open(args.out, "w", newline="") as f:
+                for i, sh in enumerate(shards):
+                    with open(sh["path"], newline="") as src:
+                        if i > 0:
+                            src.readline()
+                        shutil.copyfileobj(src, f)
 
-    env = FlappyEnv(Config(pipe_gap=args.gap, seed=args.seed))
+    scores = [s for sh in shards for s in sh["scores"]]
+    stats = dataset_io.RunningStats()
+    for sh in shards:
+        stats.merge(dataset_io.RunningStats.from_dict(sh["stats"]))
+    if args.store:
+        # os shards já têm episode_id; o store anexa e indexa, depois o temporário some
+        for sh in shards:
+            store.ingest(sh["path"], policy="expert", scores=sh["scores"], **params)
+            shutil.rmtree(sh["path"])
+        print(f"score médio: {np.mean(scores):.2f} | {len(scores)} episódios anexados a {args.store} "
+              f"({len(store.index())} no total)")
+        return
 
-    with open(args.out, "w", newline="") as f:
-        wr = csv.writer(f)
-        wr.writerow(["y_norm","vy_norm","dist_norm","delta_gap_norm","action"])
-        for ep in range(args.episodes):
-            obs, _ = env.reset()
-            done = False
-            while not done:
-                a = expert_action(obs)
-                if np.random.rand() < args.epsilon:
-                    a = np.random.randint(0, 2)
-                wr.writerow([*obs.tolist(), a])
-                obs, r, done, info = env.step(a)
-                if args.render_every and (ep % args.render_every == 0):
-                    try: env.render()
-                    except SystemExit: return
-            print(f"[coleta] ep {ep+1}/{args.episodes} score={info.get('score',0)}")
-    print(f"dataset salvo em {args.out}")
+    manifest = {"params": {**params, "episodes": args.episodes, "workers": args.workers},
+                "rows": sum(sh["rows"] for sh in shards), "shards": shards,
+                "merged": None if args.workers > 1 and args.no_merge else args.out}
+    manifest_path = dataset_io.manifest_path(args.out)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    if manifest["merged"]:
+        # treinos seguintes leem média/desvio daqui (dataset_io.feature_stats) sem outra passada
+        dataset_io.save_stats(args.out, stats)
+    print(f"score médio: {np.mean(scores):.2f} | manifest: {manifest_path}")
+    if manifest["merged"]:
+        print(f"dataset salvo em {args.out}")
 
 if __name__ == "__main__":
     main()
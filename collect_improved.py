@@ -1,49 +1,47 @@
 import argparse
-import csv
 from game_env import FlappyEnv, Config
 from expert_policy import expert_action
-import numpy as np
-import random
+from seeding import episode_rngs
+import dataset_io
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--episodes", type=int, default=100)
-    ap.add_argument("--out", type=str, default="data_improved.csv")
+    ap.add_argument("--out", type=str, default="data_improved.csv", help="*.csv ou *.fds")
     ap.add_argument("--gap", type=int, default=250)
     ap.add_argument("--epsilon", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--chunk_rows", type=int, default=65536,
+                    help="linhas por bloco gravado em disco (memória de pico constante)")
     args = ap.parse_args()
 
-    random.seed(42); np.random.seed(42)
-    env = FlappyEnv(Config(pipe_gap=args.gap, seed=42))
-
-    data = []
-    total_score = 0
-    
-    for ep in range(args.episodes):
-        obs, _ = env.reset()
-        done = False
-        ep_score = 0
-        
-        while not done:
-            a = expert_action(obs)
-            if np.random.rand() < args.epsilon:
-                a = 1 - a  # inverte com probabilidade epsilon
-            
-            data.append([obs[0], obs[1], obs[2], obs[3], a])
-            obs, _, done, info = env.step(a)
-            if 'score' in info:
-                ep_score = info['score']
-        
-        total_score += ep_score
-        print(f"[coleta] ep {ep+1}/{args.episodes} score={ep_score}")
-    
-    print(f"Score médio: {total_score/args.episodes:.2f}")
-    
-    with open(args.out, "w", newline="") as f:
-        wr = csv.writer(f)
-        wr.writerow(["y_norm","vy_norm","dist_norm","delta_gap_norm","action"])
-        wr.writerows(data)
-    
+    env = FlappyEnv(Config(pipe_gap=args.gap, seed=args.seed))
+    scores = dataset_io.RunningStats()
+
+    # cada transição vai direto para o bloco do writer, que é gravado a cada chunk_rows
+    with dataset_io.open_writer(args.out, block_rows=args.chunk_rows) as wr:
+        for ep in range(args.episodes):
+            env_seed, noise = episode_rngs(args.seed, ep)
+            obs, _ = env.reset(seed=env_seed)
+            done = False
+            ep_score = 0
+
+            while not done:
+                a = expert_action(obs)
+                if noise.random() < args.epsilon:
+                    a = 1 - a  # inverte com probabilidade epsilon
+
+                next_obs, r, done, info = env.step(a)
+                wr.append(obs, a, r, done, ep)
+                obs = next_obs
+                if 'score' in info:
+                    ep_score = info['score']
+
+            scores.update(ep_score)
+            print(f"[coleta] ep {ep+1}/{args.episodes} score={ep_score} | "
+                  f"média={scores.mean:.2f} ± {scores.std:.2f} máx={scores.max:.0f} linhas={wr.rows}")
+
+    print(f"Score médio: {scores.mean:.2f}")
     print(f"dataset salvo em {args.out}")
 
 if __name__ == "__main__":
@@ -0,0 +1,656 @@
+"""
+Formato binário colunar para datasets de imitação (diretório *.fds).
+
+    data.fds/
+        meta.json         {"rows": N, "features": [...], "columns": {nome: [dtype, forma]}}
+        X.bin             float32 (N, 4)  y_norm, vy_norm, dist_norm, delta_gap_norm
+        action.bin        uint8   (N,)
+        reward.bin        float32 (N,)   opcional
+        done.bin          uint8   (N,)   opcional
+        episode_id.bin    int32   (N,)   opcional
+
+Cada coluna é um arquivo binário cru, gravado em blocos e lido com np.memmap
+(sem parsing). meta.json só é atualizado depois de cada bloco gravado, então um
+processo que morre no meio deixa um dataset válido até o último flush.
+
+Um .fds pode também ser um store de episódios (DatasetStore): episodes.bin guarda,
+por episódio, a faixa de linhas e a proveniência (seed, gap, epsilon, política),
+e coletas novas são anexadas ao fim dos arquivos sem reescrevê-los.
+
+Uso:
+    python dataset_io.py convert data.csv data_final.csv    # -> data.fds, data_final.fds
+    python dataset_io.py ingest store.fds data.fds --gap 150 --epsilon 0.05 --seed 42
+    python dataset_io.py info store.fds --where "gap==150 and epsilon<0.1"
+    python dataset_io.py stats data.fds --workers 4          # média/desvio -> meta.json["stats"]
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import numpy as np
+
+FEATURES = ["y_norm", "vy_norm", "dist_norm", "delta_gap_norm"]
+COLUMNS = {
+    "X": ("float32", (len(FEATURES),)),
+    "action": ("uint8", ()),
+    "reward": ("float32", ()),
+    "done": ("uint8", ()),
+    "episode_id": ("int32", ()),
+}
+EXTRAS = ("reward", "done", "episode_id")
+EPISODE_DTYPE = np.dtype([("start", "<i8"), ("rows", "<i8"), ("episode", "<i8"), ("seed", "<i8"),
+                          ("gap", "<i4"), ("epsilon", "<f8"), ("policy", "<i2"), ("score", "<i4")])
+_OPS = {"==": np.equal, "!=": np.not_equal, "<=": np.less_equal, ">=": np.greater_equal,
+        "<": np.less, ">": np.greater}
+
+
+def is_fds(path: str) -> bool:
+    return path.rstrip("/\\").endswith(".fds") or os.path.exists(os.path.join(path, "meta.json"))
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def dataset_rows(path: str) -> int:
+    """Número de linhas gravadas num .fds (lido do meta.json, sem abrir as colunas)."""
+    return _read_meta(path)["rows"]
+
+
+def _write_meta(path: str, meta: dict):
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+class DatasetWriter:
+    """Grava linhas num .fds acumulando blocos de `block_rows` em arrays pré-alocados."""
+    def __init__(self, path: str, extras: Sequence[str] = EXTRAS, block_rows: int = 65536, append: bool = False,
+                 info: Optional[dict] = None):
+        """`info` (proveniência: seed, gap, política...) fica em meta.json["info"]."""
+        self.path = path
+        self.block_rows = block_rows
+        os.makedirs(path, exist_ok=True)
+        if not append and is_store(path):
+            # truncar as colunas deixaria episodes.bin apontando para linhas que não existem
+            raise ValueError(f"{path} é um store com índice de episódios: use append=True ou DatasetStore.ingest")
+        if append and os.path.exists(os.path.join(path, "meta.json")):
+            self.meta = _read_meta(path)
+        else:
+            names = ["X", "action"] + [e for e in EXTRAS if e in extras]
+            self.meta = {"rows": 0, "features": FEATURES, "info": info or {},
+                         "columns": {n: [COLUMNS[n][0], list(COLUMNS[n][1])] for n in names}}
+            for n in names:
+                open(self._file(n), "wb").close()
+            _write_meta(path, self.meta)
+        self.columns = list(self.meta["columns"])
+        self._buf = {n: np.empty((block_rows, *shape), dtype=dt) for n, (dt, shape) in self.meta["columns"].items()}
+        self._n = 0
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.bin")
+
+    def append(self, obs, action: int, reward: float = 0.0, done: bool = False, episode_id: int = 0):
+        i = self._n
+        buf = self._buf
+        buf["X"][i] = obs
+        buf["action"][i] = action
+        if "reward" in buf:
+            buf["reward"][i] = reward
+        if "done" in buf:
+            buf["done"][i] = done
+        if "episode_id" in buf:
+            buf["episode_id"][i] = episode_id
+        self._n = i + 1
+        if self._n == self.block_rows:
+            self.flush()
+
+    def append_batch(self, X: np.ndarray, action: np.ndarray, **extras):
+        """Grava um lote inteiro direto nos arquivos (após esvaziar o bloco pendente)."""
+        self.flush()
+        cols = {"X": X, "action": action, **extras}
+        n = len(X)
+        for name in self.columns:
+            dt, shape = self.meta["columns"][name]
+            data = cols.get(name)
+            arr = np.zeros((n, *shape), dtype=dt) if data is None else np.ascontiguousarray(data, dtype=dt)
+            with open(self._file(name), "ab") as f:
+                arr.tofile(f)
+        self.meta["rows"] += n
+        _write_meta(self.path, self.meta)
+
+    def flush(self):
+        if self._n == 0:
+            return
+        for name, arr in self._buf.items():
+            with open(self._file(name), "ab") as f:
+                arr[:self._n].tofile(f)
+        self.meta["rows"] += self._n
+        self._n = 0
+        _write_meta(self.path, self.meta)
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"] + self._n
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvWriter:
+    """Mesma interface do DatasetWriter, gravando o CSV de sempre (só features + action)."""
+    def __init__(self, path: str, block_rows: int = 65536, **_):
+        self._f = open(path, "w", newline="")
+        self._wr = csv.writer(self._f)
+        self._wr.writerow(FEATURES + ["action"])
+        self.block_rows = block_rows
+        self.rows = 0
+
+    def append(self, obs, action: int, reward: float = 0.0, done: bool = False, episode_id: int = 0):
+        self._wr.writerow([*obs.tolist(), action])
+        self.rows += 1
+        if self.rows % self.block_rows == 0:
+            self._f.flush()
+
+    def append_batch(self, X: np.ndarray, action: np.ndarray, **extras):
+        self._wr.writerows([*x, int(a)] for x, a in zip(X.tolist(), action))
+        self.rows += len(X)
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(path: str, **kwargs):
+    """DatasetWriter para caminhos *.fds, CsvWriter para o resto."""
+    return DatasetWriter(path, **kwargs) if is_fds(path) else CsvWriter(path, **kwargs)
+
+
+class RunningStats:
+    """
+    Média/variância em streaming (Welford/Chan), escalar ou por coluna.
+    update() aceita um valor ou um lote (N, ...); merge() junta estatísticas
+    calculadas em paralelo sobre pedaços diferentes.
+    """
+    def __init__(self):
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 0:
+            x = x.reshape(1)
+        if len(x) == 0:
+            return self
+        other = RunningStats()
+        other.n = len(x)
+        other._mean = x.mean(axis=0)
+        other._m2 = ((x - other._mean) ** 2).sum(axis=0)
+        other.min = x.min(axis=0)
+        other.max = x.max(axis=0)
+        return self.merge(other)
+
+    def merge(self, other: "RunningStats"):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other._mean - self._mean
+        self._mean = self._mean + delta * (other.n / n)
+        self._m2 = self._m2 + other._m2 + delta ** 2 * (self.n * other.n / n)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.n = n
+        return self
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def var(self):
+        return self._m2 / self.n if self.n else self._m2 * 0.0
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def to_dict(self) -> dict:
+        return {"n": int(self.n), "mean": np.asarray(self._mean).tolist(), "m2": np.asarray(self._m2).tolist(),
+                "min": np.asarray(self.min).tolist(), "max": np.asarray(self.max).tolist()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RunningStats":
+        st = cls()
+        st.n = d["n"]
+        st._mean, st._m2 = np.asarray(d["mean"]), np.asarray(d["m2"])
+        st.min, st.max = np.asarray(d["min"]), np.asarray(d["max"])
+        return st
+
+
+def array_stats(X: np.ndarray, chunk_rows: int = 1 << 16) -> RunningStats:
+    """RunningStats das colunas de X em pedaços (sem temporários do tamanho de X)."""
+    stats = RunningStats()
+    for a in range(0, len(X), chunk_rows):
+        stats.update(X[a:a + chunk_rows])
+    return stats
+
+
+def _range_stats(job) -> RunningStats:
+    path, a, b, chunk_rows = job
+    stats = RunningStats()
+    for c in range(a, b, chunk_rows):
+        stats.update(read_rows(path, c, min(c + chunk_rows, b), ("X",))["X"])
+    return stats
+
+
+def manifest_path(path: str) -> str:
+    """<arquivo>.manifest.json: nome completo + sufixo, então foo.csv e foo.fds não dividem manifesto."""
+    return path.rstrip("/\\") + ".manifest.json"
+
+
+def _stats_source(path: str) -> dict:
+    """O que invalida as estatísticas guardadas: nº de linhas (.fds) ou tamanho/mtime (CSV)."""
+    if is_fds(path):
+        return {"rows": dataset_rows(path)}
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def save_stats(path: str, stats: RunningStats, where: Optional[str] = None):
+    """
+    Guarda as estatísticas das features no manifesto do dataset: meta.json de um .fds
+    ou o <arquivo>.manifest.json ao lado de um CSV (o mesmo que collect_dataset grava).
+    """
+    entry = {**stats.to_dict(), "source": _stats_source(path)}
+    if is_fds(path):
+        meta = _read_meta(path)
+        meta.setdefault("stats", {})[where or "*"] = entry
+        _write_meta(path, meta)
+        return
+    mpath = manifest_path(path)
+    manifest = {}
+    if os.path.exists(mpath):
+        with open(mpath) as f:
+            manifest = json.load(f)
+    manifest["stats"] = entry
+    tmp = mpath + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, mpath)
+
+
+def cached_stats(path: str, where: Optional[str] = None) -> Optional[RunningStats]:
+    """Estatísticas guardadas por save_stats, se ainda valem para o arquivo atual."""
+    if is_fds(path):
+        entry = _read_meta(path).get("stats", {}).get(where or "*")
+    elif not where and os.path.exists(manifest_path(path)):
+        with open(manifest_path(path)) as f:
+            entry = json.load(f).get("stats")
+    else:
+        entry = None
+    if entry is None or entry.get("source") != _stats_source(path):
+        return None
+    return RunningStats.from_dict(entry)
+
+
+def feature_stats(path: str, where: Optional[str] = None, workers: int = 1, chunk_rows: int = 1 << 20,
+                  cache: bool = True) -> RunningStats:
+    """
+    Média/variância/min/max das features de um dataset numa passada em pedaços
+    (Welford/Chan). Num .fds as faixas são divididas entre `workers` processos e os
+    resultados parciais são unidos com merge(). Com cache=True o resultado fica no
+    manifesto (save_stats) e as próximas chamadas não leem os dados.
+    """
+    if cache:
+        stats = cached_stats(path, where)
+        if stats is not None:
+            return stats
+    if is_fds(path):
+        ranges = DatasetStore(path).ranges(where) if where else [(0, dataset_rows(path))]
+        # faixas de até chunk_rows linhas, distribuídas entre os processos
+        jobs = [(path, a, min(a + chunk_rows, b), chunk_rows) for a0, b in ranges for a in range(a0, b, chunk_rows)]
+        if workers > 1 and len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                parts = list(pool.map(_range_stats, jobs))
+        else:
+            parts = map(_range_stats, jobs)
+        stats = RunningStats()
+        for part in parts:
+            stats.merge(part)
+    else:
+        if where:
+            raise ValueError(f"--where exige um store com índice de episódios: {path}")
+        import pandas as pd
+        stats = RunningStats()
+        for df in pd.read_csv(path, chunksize=chunk_rows):
+            stats.update(df[FEATURES].values.astype(np.float32))
+    if cache:
+        save_stats(path, stats, where)
+    return stats
+
+
+def compact(X: np.ndarray, y: np.ndarray, bins: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Coreset ponderado: (X_c, y_c, pesos inteiros).
+
+    bins=None: remove linhas (X float32, ação) repetidas bit a bit.
+    bins=k:    agrupa as observações numa grade k^4 (faixa min..max de cada feature)
+               e emite, por (célula, ação), a média das observações e a contagem.
+    Treinar com os pesos equivale (exato no primeiro caso) a treinar nas linhas originais.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y).reshape(-1).astype(np.uint8)
+    if bins is None:
+        keys = np.concatenate([X.view(np.uint32), y[:, None].astype(np.uint32)], axis=1)
+        keys = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.shape[1] * 4))).ravel()
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        order = np.argsort(first)   # mantém a ordem da primeira ocorrência
+        return X[first[order]], y[first[order]], counts[order].astype(np.int64)
+    lo, hi = X.min(axis=0), X.max(axis=0)
+    cell = ((X - lo) * (bins / np.maximum(hi - lo, 1e-12))).astype(np.int64)
+    np.clip(cell, 0, bins - 1, out=cell)
+    flat = cell @ (bins ** np.arange(X.shape[1], dtype=np.int64)) * 2 + y
+    uniq, inverse, counts = np.unique(flat, return_inverse=True, return_counts=True)
+    Xc = np.stack([np.bincount(inverse, weights=X[:, j], minlength=len(uniq)) for j in range(X.shape[1])], axis=1)
+    Xc /= counts[:, None]
+    return Xc.astype(np.float32), (uniq % 2).astype(np.uint8), counts.astype(np.int64)
+
+
+def open_dataset(path: str) -> Dict[str, np.ndarray]:
+    """Todas as colunas de um .fds como np.memmap somente leitura."""
+    meta = _read_meta(path)
+    n = meta["rows"]
+    out = {}
+    for name, (dt, shape) in meta["columns"].items():
+        if n == 0:
+            out[name] = np.empty((0, *shape), dtype=dt)
+        else:
+            out[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dt, mode="r", shape=(n, *shape))
+    return out
+
+
+def read_rows(path: str, start: int, stop: int, names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Linhas [start, stop) de um .fds lidas para arrays comuns. Ao contrário das fatias
+    memmap, as páginas lidas não ficam acumuladas no RSS do processo.
+    """
+    meta = _read_meta(path)
+    out = {}
+    for name in names or meta["columns"]:
+        dt, shape = meta["columns"][name]
+        dt = np.dtype(dt)
+        width = int(np.prod(shape, dtype=np.int64))
+        arr = np.fromfile(os.path.join(path, f"{name}.bin"), dtype=dt, count=(stop - start) * width,
+                          offset=start * width * dt.itemsize)
+        out[name] = arr.reshape(-1, *shape)
+    return out
+
+
+def load_xy(path: str, where: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (X float32 (N,4), y float32 (N,)) de um .fds (memmap) ou de um CSV.
+    `where` filtra episódios de um DatasetStore (ver DatasetStore.select).
+    """
+    if where:
+        if not is_store(path):
+            raise ValueError(f"--where exige um store com índice de episódios: {path}")
+        return DatasetStore(path).load_xy(where)
+    if is_fds(path):
+        cols = open_dataset(path)
+        return cols["X"], np.asarray(cols["action"], dtype=np.float32)
+    import pandas as pd
+    df = pd.read_csv(path)
+    return df[FEATURES].values.astype(np.float32), df["action"].values.astype(np.float32)
+
+
+def concat(paths: Iterable[str], out: str):
+    """Concatena .fds com as mesmas colunas, na ordem dada, copiando os arquivos crus."""
+    paths = list(paths)
+    metas = [_read_meta(p) for p in paths]
+    columns = metas[0]["columns"]
+    if any(m["columns"] != columns for m in metas):
+        raise ValueError("datasets com colunas diferentes não podem ser concatenados")
+    os.makedirs(out, exist_ok=True)
+    for name in columns:
+        with open(os.path.join(out, f"{name}.bin"), "wb") as dst:
+            for p in paths:
+                with open(os.path.join(p, f"{name}.bin"), "rb") as src:
+                    shutil.copyfileobj(src, dst)
+    _write_meta(out, {**metas[0], "rows": sum(m["rows"] for m in metas)})
+
+
+def is_store(path: str) -> bool:
+    return os.path.exists(os.path.join(path, "episodes.bin"))
+
+
+class DatasetStore:
+    """
+    .fds append-only com índice de episódios. Cada entrada de episodes.bin
+    (EPISODE_DTYPE) aponta para a faixa [start, start+rows) das colunas e guarda
+    seed mestre, número do episódio, gap, epsilon, política e score.
+
+    ingest() anexa uma coleta (outro .fds ou CSV) ao fim dos arquivos; o índice só
+    é estendido depois que as linhas e o meta.json foram gravados, então uma
+    interrupção deixa no máximo linhas órfãs, nunca um episódio apontando para o vazio.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        if not is_store(path):
+            if os.path.exists(os.path.join(path, "meta.json")):
+                raise ValueError(f"{path} é um .fds sem índice de episódios; use ingest num store novo")
+            DatasetWriter(path).close()
+            open(self._index_file, "wb").close()
+
+    @property
+    def _index_file(self) -> str:
+        return os.path.join(self.path, "episodes.bin")
+
+    @property
+    def policies(self):
+        return _read_meta(self.path).get("policies", [])
+
+    def index(self) -> np.ndarray:
+        idx = np.fromfile(self._index_file, dtype=EPISODE_DTYPE)
+        rows = dataset_rows(self.path)
+        bad = np.flatnonzero(idx["start"] + idx["rows"] > rows)
+        if len(bad):
+            raise ValueError(f"{self.path}: {len(bad)} entradas do índice passam das {rows} linhas "
+                             f"(primeira: entrada {int(bad[0])}); o store foi sobrescrito?")
+        return idx
+
+    def ingest(self, src: str, seed: int, gap: int, epsilon: float, policy: str = "expert",
+               scores: Optional[Sequence[int]] = None, chunk_rows: int = 1 << 20) -> np.ndarray:
+        """
+        Anexa `src` ao store. Fronteiras de episódio vêm de episode_id (ou de done);
+        um CSV sem essas colunas entra como um episódio só (episode=-1).
+        Devolve as entradas de índice criadas.
+        """
+        if is_fds(src):
+            cols = open_dataset(src)
+        else:
+            X, action = load_xy(src)
+            cols = {"X": X, "action": action.astype(np.uint8)}
+        n = len(cols["X"])
+        if "episode_id" in cols:
+            ep = cols["episode_id"]
+            starts = np.concatenate([[0], np.flatnonzero(ep[1:] != ep[:-1]) + 1]) if n else np.zeros(0, np.int64)
+            numbers = np.asarray(ep[starts], dtype=np.int64)
+        elif "done" in cols:
+            starts = np.concatenate([[0], np.flatnonzero(cols["done"][:-1]) + 1]) if n else np.zeros(0, np.int64)
+            numbers = np.arange(len(starts))
+        else:
+            starts = np.zeros(1 if n else 0, np.int64)
+            numbers = np.full(len(starts), -1)
+        if scores is not None and len(scores) != len(starts):
+            raise ValueError(f"{len(scores)} scores para {len(starts)} episódios em {src}")
+
+        wr = DatasetWriter(self.path, append=True)
+        policies = wr.meta.setdefault("policies", [])
+        if policy not in policies:
+            policies.append(policy)
+        base = wr.rows
+        for a in range(0, n, chunk_rows):
+            b = min(a + chunk_rows, n)
+            wr.append_batch(cols["X"][a:b], cols["action"][a:b],
+                            **{e: cols[e][a:b] for e in EXTRAS if e in cols})
+        _write_meta(self.path, wr.meta)   # grava "policies" mesmo sem linhas novas
+
+        entries = np.zeros(len(starts), dtype=EPISODE_DTYPE)
+        entries["start"] = base + starts
+        entries["rows"] = np.diff(np.append(starts, n))
+        entries["episode"] = numbers
+        entries["seed"] = seed
+        entries["gap"] = gap
+        entries["epsilon"] = epsilon
+        entries["policy"] = policies.index(policy)
+        entries["score"] = -1 if scores is None else scores
+        with open(self._index_file, "ab") as f:
+            entries.tofile(f)
+        return entries
+
+    def select(self, where: Optional[str] = None) -> np.ndarray:
+        """
+        Entradas do índice que satisfazem `where`: condições `campo op valor`
+        unidas por "and", p.ex. "gap==150 and epsilon<0.1 and policy==expert".
+        """
+        idx = self.index()
+        mask = np.ones(len(idx), dtype=bool)
+        for cond in filter(None, (c.strip() for c in (where or "").split(" and "))):
+            m = re.fullmatch(r"(\w+)\s*(==|!=|<=|>=|<|>)\s*(\S+)", cond)
+            if m is None or m.group(1) not in EPISODE_DTYPE.names:
+                raise ValueError(f"condição inválida: {cond!r} (campos: {', '.join(EPISODE_DTYPE.names)})")
+            field, op, value = m.groups()
+            if field == "policy":
+                policies = self.policies
+                value = policies.index(value) if value in policies else -1
+            mask &= _OPS[op](idx[field], np.asarray(value, dtype=idx[field].dtype))
+        return idx[mask]
+
+    def slices(self, entries: np.ndarray) -> list:
+        """Um dict {coluna: fatia memmap} por entrada do índice."""
+        cols = open_dataset(self.path)
+        return [{k: v[e["start"]:e["start"] + e["rows"]] for k, v in cols.items()} for e in entries]
+
+    def episode(self, i: int) -> Dict[str, np.ndarray]:
+        return self.slices(self.index()[i:i + 1])[0]
+
+    def ranges(self, where: Optional[str] = None) -> list:
+        """Faixas [a, b) de linhas dos episódios selecionados, com vizinhos unidos."""
+        entries = np.sort(self.select(where), order="start")
+        ranges = []
+        for s, n in zip(entries["start"].tolist(), entries["rows"].tolist()):
+            if ranges and ranges[-1][1] == s:
+                ranges[-1][1] = s + n
+            else:
+                ranges.append([s, s + n])
+        return [tuple(r) for r in ranges]
+
+    def load_xy(self, where: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (X, y) dos episódios selecionados. Se a seleção for uma faixa contínua,
+        X é a própria fatia memmap (sem cópia).
+        """
+        cols = open_dataset(self.path)
+        ranges = self.ranges(where)
+        if len(ranges) == 1:
+            (a, b), = ranges
+            return cols["X"][a:b], np.asarray(cols["action"][a:b], dtype=np.float32)
+        X = np.concatenate([cols["X"][a:b] for a, b in ranges]) if ranges else cols["X"][:0]
+        y = np.concatenate([cols["action"][a:b] for a, b in ranges]) if ranges else cols["action"][:0]
+        return X, y.astype(np.float32)
+
+
+def convert_csv(src: str, dst: Optional[str] = None, chunk_rows: int = 1 << 20) -> str:
+    """Converte um data*.csv (features + action) para .fds, em pedaços."""
+    import pandas as pd
+    dst = dst or os.path.splitext(src)[0] + ".fds"
+    with DatasetWriter(dst, extras=()) as wr:
+        for df in pd.read_csv(src, chunksize=chunk_rows):
+            wr.append_batch(df[FEATURES].values, df["action"].values)
+    return dst
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("convert", help="CSV -> .fds")
+    p.add_argument("csv", nargs="+")
+    p.add_argument("--out", type=str, default=None, help="destino (só com um CSV)")
+    p = sub.add_parser("info", help="resumo de um .fds (e dos episódios, se for um store)")
+    p.add_argument("path")
+    p.add_argument("--where", type=str, default=None, help='filtro de episódios, p.ex. "gap==150 and epsilon<0.1"')
+    p = sub.add_parser("stats", help="média/desvio das features (guardados no manifesto)")
+    p.add_argument("path")
+    p.add_argument("--where", type=str, default=None)
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--recompute", action="store_true", help="ignora as estatísticas guardadas")
+    p = sub.add_parser("ingest", help="anexa .fds/CSV a um store de episódios")
+    p.add_argument("store")
+    p.add_argument("src", nargs="+")
+    p.add_argument("--seed", type=int, default=-1, help="seed mestre da coleta (-1 = desconhecida)")
+    p.add_argument("--gap", type=int, default=150)
+    p.add_argument("--epsilon", type=float, default=0.0)
+    p.add_argument("--policy", type=str, default="expert")
+    args = ap.parse_args()
+
+    if args.cmd == "convert":
+        if args.out and len(args.csv) > 1:
+            raise ValueError("--out só vale para um CSV")
+        for src in args.csv:
+            dst = convert_csv(src, args.out)
+            print(f"{src} ({os.path.getsize(src) / 1e6:.2f} MB) -> {dst} "
+                  f"({sum(os.path.getsize(os.path.join(dst, f)) for f in os.listdir(dst)) / 1e6:.2f} MB, "
+                  f"{_read_meta(dst)['rows']} linhas)")
+    elif args.cmd == "info":
+        meta = _read_meta(args.path)
+        print(json.dumps(meta, indent=1))
+        if is_store(args.path):
+            store = DatasetStore(args.path)
+            entries = store.select(args.where)
+            groups = {}
+            for e in entries:
+                key = (store.policies[e["policy"]], int(e["gap"]), float(e["epsilon"]), int(e["seed"]))
+                g = groups.setdefault(key, [0, 0])
+                g[0] += 1
+                g[1] += int(e["rows"])
+            print(f"{len(entries)} episódios, {int(entries['rows'].sum())} linhas")
+            for (policy, gap, eps, seed), (n_ep, rows) in sorted(groups.items()):
+                print(f"  {policy:<10} gap={gap:<4} epsilon={eps:<6g} seed={seed:<6} episódios={n_ep:<5} linhas={rows}")
+    elif args.cmd == "stats":
+        stats = feature_stats(args.path, args.where, workers=args.workers, cache=not args.recompute)
+        if args.recompute:
+            save_stats(args.path, stats, args.where)
+        print(f"{stats.n} linhas")
+        for name, m, sd, lo, hi in zip(FEATURES, stats.mean, stats.std, stats.min, stats.max):
+            print(f"  {name:<16} média={m:+.5f} desvio={sd:.5f} min={lo:+.4f} max={hi:+.4f}")
+    elif args.cmd == "ingest":
+        store = DatasetStore(args.store)
+        for src in args.src:
+            entries = store.ingest(src, seed=args.seed, gap=args.gap, epsilon=args.epsilon, policy=args.policy)
+            print(f"{src}: +{len(entries)} episódios, +{int(entries['rows'].sum())} linhas -> {args.store}")
+
+if __name__ == "__main__":
+    main()
@@ -48,3 +48,24 @@ def expert_action(obs: np.ndarray) -> int:
     
     # Padrão: deixar a gravidade agir naturalmente
     return 0
+
+def expert_action_batch(obs: np.ndarray) -> np.ndarray:
+    """
+    Versão vetorizada de expert_action para obs (N,4): mesmas regras, na mesma
+    ordem de prioridade (np.select escolhe a primeira condição verdadeira).
+    """
+    obs = np.asarray(obs)
+    y_norm, vy_norm, dist_norm, delta_gap_norm = obs[:, 0], obs[:, 1], obs[:, 2], obs[:, 3]
+    gap_center = 0.5 - delta_gap_norm
+    near_pipe = dist_norm < 0.9
+    conds = [
+        y_norm <= 0.1,                                   # proteção: chão
+        y_norm >= 0.9,                                   # proteção: teto
+        vy_norm < -0.4,                                  # anti-oscilação
+        near_pipe & (y_norm > gap_center + 0.2),         # abaixo do gap
+        near_pipe & (y_norm < gap_center - 0.2),         # acima do gap
+        y_norm > 0.7,                                    # muito alto
+        (y_norm < 0.25) & (vy_norm >= 0),                # muito baixo e não subindo
+        (vy_norm > 0.5) & (y_norm > 0.3),                # caindo rápido
+    ]
+    return np.select(conds, [1, 0, 0, 1, 0, 0, 1, 1], default=0)
@@ -0,0 +1,213 @@
+"""
+Compila expert_action numa tabela densa (int8) sobre a grade discretizada de
+(y_norm, vy_norm, dist_norm, delta_gap_norm).
+
+Código de cada célula:
+    0 / 1  ação constante em toda a célula (a tabela é exata ali)
+    2 / 3  a célula cruza uma fronteira de decisão; 2 + ação no centro da célula.
+           label() recalcula essas (e as observações fora da grade) com a regra exata.
+
+A tabela fica num .npy (abre com mmap) + um .json com faixas e resolução.
+
+Desempenho (benchmarks.py expert_table): label_fast, só o gather, rotula ~2x mais
+rápido que expert_action_batch em observações uniformes, mas erra nas células
+ambíguas. label(), exato, também roda a regra nas linhas de fallback e fica no mesmo
+ritmo de expert_action_batch (tanto em observações uniformes, com ~31% de fallback a
+64^4, quanto em data_final.csv, com ~5%): para rótulos exatos a tabela não é o caminho
+rápido, e vale por ser um artefato fixo/portável da política.
+
+Uso:
+    python expert_table.py --data data_final.csv --out expert_table.npy
+"""
+import argparse
+import json
+import os
+import warnings
+from typing import Sequence, Tuple
+import numpy as np
+import pandas as pd
+from expert_policy import expert_action_batch
+
+FEATURES = ["y_norm", "vy_norm", "dist_norm", "delta_gap_norm"]
+RANGES = ((0.0, 1.0), (-1.0, 1.0), (0.0, 1.0), (-1.0, 1.0))
+EPS = 1e-5   # folga ao testar as bordas da célula (arredondamento em float32)
+
+FALSE, TRUE, MIXED = 0, 1, 2
+
+
+def _axis_state(edges: np.ndarray, pred) -> np.ndarray:
+    """Estado de um predicado monótono em 1 eixo para cada célula [edges[i], edges[i+1]]."""
+    lo = pred(np.float32(edges[:-1] - EPS))
+    hi = pred(np.float32(edges[1:] + EPS))
+    return np.where(lo & hi, TRUE, np.where(~lo & ~hi, FALSE, MIXED)).astype(np.int8)
+
+
+def _plane_state(y_edges: np.ndarray, d_edges: np.ndarray, pred) -> np.ndarray:
+    """Estado de um predicado linear em (y, delta) nos 4 cantos de cada célula."""
+    corners = [pred(np.float32(ye)[:, None], np.float32(de)[None, :])
+               for ye in (y_edges[:-1] - EPS, y_edges[1:] + EPS)
+               for de in (d_edges[:-1] - EPS, d_edges[1:] + EPS)]
+    all_true = np.logical_and.reduce(corners)
+    all_false = ~np.logical_or.reduce(corners)
+    return np.where(all_true, TRUE, np.where(all_false, FALSE, MIXED)).astype(np.int8)
+
+
+def _and(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.where((a == FALSE) | (b == FALSE), FALSE,
+                    np.where((a == TRUE) & (b == TRUE), TRUE, MIXED)).astype(np.int8)
+
+
+class ExpertTable:
+    def __init__(self, codes: np.ndarray, ranges=RANGES):
+        self.codes = codes
+        self.bins = codes.shape
+        self.lo = np.array([r[0] for r in ranges], dtype=np.float64)
+        self.hi = np.array([r[1] for r in ranges], dtype=np.float64)
+
+    @classmethod
+    def compile(cls, bins: Sequence[int]) -> "ExpertTable":
+        """Monta a tabela propagando o estado de cada regra do expert (na ordem de prioridade)."""
+        edges = [np.linspace(lo, hi, b + 1) for (lo, hi), b in zip(RANGES, bins)]
+        y_e, vy_e, dist_e, d_e = edges
+        shape4 = lambda a, axes: a.reshape([a.shape[axes.index(k)] if k in axes else 1 for k in range(4)])
+
+        y = lambda p: shape4(_axis_state(y_e, p), (0,))
+        vy = lambda p: shape4(_axis_state(vy_e, p), (1,))
+        dist = lambda p: shape4(_axis_state(dist_e, p), (2,))
+        yd = lambda p: _plane_state(y_e, d_e, p).reshape(bins[0], 1, 1, bins[3])
+
+        near_pipe = dist(lambda v: v < 0.9)
+        rules = [  # (estado do predicado, ação) — mesma ordem de expert_action
+            (y(lambda v: v <= 0.1), 1),
+            (y(lambda v: v >= 0.9), 0),
+            (vy(lambda v: v < -0.4), 0),
+            (_and(near_pipe, yd(lambda yv, dv: yv > (np.float32(0.5) - dv) + 0.2)), 1),
+            (_and(near_pipe, yd(lambda yv, dv: yv < (np.float32(0.5) - dv) - 0.2)), 0),
+            (y(lambda v: v > 0.7), 0),
+            (_and(y(lambda v: v < 0.25), vy(lambda v: v >= 0)), 1),
+            (_and(vy(lambda v: v > 0.5), y(lambda v: v > 0.3)), 1),
+        ]
+        # de trás pra frente: resultado da cascata a partir da regra k (0, 1 ou MIXED)
+        result = np.zeros(tuple(bins), dtype=np.int8)
+        for state, action in reversed(rules):
+            mixed_ok = np.where(result == action, action, MIXED).astype(np.int8)
+            result = np.where(state == TRUE, np.int8(action),
+                              np.where(state == FALSE, result, mixed_ok)).astype(np.int8)
+
+        # células ambíguas guardam 2 + ação no centro (rótulo aproximado sem fallback)
+        amb = np.flatnonzero(result.ravel() == MIXED)
+        if amb.size:
+            centers = [(e[:-1] + e[1:]) / 2 for e in edges]
+            idx = np.unravel_index(amb, tuple(bins))
+            obs = np.stack([c[i] for c, i in zip(centers, idx)], axis=1).astype(np.float32)
+            result.ravel()[amb] = 2 + expert_action_batch(obs)
+        return cls(result)
+
+    def cell_index(self, obs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Índice plano da célula de cada observação e máscara de quem está dentro da grade."""
+        obs = np.asarray(obs, dtype=np.float32)
+        n = len(obs)
+        scale = np.asarray(self.bins) / (self.hi - self.lo)
+        # eixo a eixo em float32, no lugar: flat = ((i0*b1 + i1)*b2 + i2)*b3 + i3
+        flat = np.zeros(n, dtype=np.intp)
+        inside = np.ones(n, dtype=bool)
+        pos = np.empty(n, dtype=np.float32)
+        cell = np.empty(n, dtype=np.intp)
+        ok = np.empty(n, dtype=bool)
+        for k, b in enumerate(self.bins):
+            np.subtract(obs[:, k], np.float32(self.lo[k]), out=pos)
+            pos *= np.float32(scale[k])
+            inside &= np.greater_equal(pos, 0, out=ok)
+            inside &= np.less_equal(pos, b, out=ok)
+            np.clip(pos, 0, b - 1, out=pos)
+            np.copyto(cell, pos, casting="unsafe")
+            flat *= b
+            flat += cell
+        return flat, inside
+
+    def label_fast(self, obs: np.ndarray) -> np.ndarray:
+        """Só o gather (aproximado nas células ambíguas e fora da grade)."""
+        flat, _ = self.cell_index(obs)
+        return self.codes.reshape(-1)[flat] & 1
+
+    def label(self, obs: np.ndarray) -> np.ndarray:
+        """Gather + regra exata onde a tabela não é exata: sempre igual a expert_action."""
+        flat, inside = self.cell_index(obs)
+        codes = self.codes.reshape(-1)[flat]
+        exact = np.flatnonzero((codes >= 2) | ~inside)
+        codes &= 1
+        out = codes.astype(np.int64)
+        if exact.size:
+            out[exact] = expert_action_batch(np.asarray(obs)[exact])
+        return out
+
+    def report(self, obs: np.ndarray) -> dict:
+        flat, inside = self.cell_index(obs)
+        codes = self.codes.reshape(-1)[flat]
+        ref = expert_action_batch(obs)
+        return {
+            "bins": list(self.bins),
+            "size_bytes": int(self.codes.nbytes),
+            "ambiguous_cells": float((self.codes >= 2).mean()),
+            "fallback_rate": float(((codes >= 2) | ~inside).mean()),
+            "mismatch_rate_table_only": float(((codes & 1) != ref).mean()),
+            "mismatch_rate": float((self.label(obs) != ref).mean()),
+        }
+
+    @classmethod
+    def auto_compile(cls, sample: np.ndarray, max_fallback: float = 0.05,
+                     candidates: Sequence[int] = (8, 16, 32, 48, 64, 96)) -> Tuple["ExpertTable", list]:
+        """
+        Menor resolução (uniforme por eixo) cujo fallback na amostra fica <= max_fallback.
+        Se nenhum candidato chega lá, devolve o mais fino e avisa (RuntimeWarning).
+        """
+        reports = []
+        for b in candidates:
+            table = cls.compile((b, b, b, b))
+            rep = table.report(sample)
+            reports.append(rep)
+            print(f"[tabela] bins={b}^4 fallback={rep['fallback_rate']:.4f} "
+                  f"mismatch(só tabela)={rep['mismatch_rate_table_only']:.4f}")
+            if rep["fallback_rate"] <= max_fallback:
+                break
+        else:
+            warnings.warn(f"nenhuma resolução em {tuple(candidates)} atinge fallback <= {max_fallback:.2%}; "
+                          f"usando {candidates[-1]}^4 com {reports[-1]['fallback_rate']:.2%}", RuntimeWarning)
+        return table, reports
+
+    def save(self, path: str):
+        np.save(path, self.codes)
+        with open(os.path.splitext(path)[0] + ".json", "w") as f:
+            json.dump({"features": FEATURES, "ranges": [list(r) for r in zip(self.lo, self.hi)],
+                       "bins": list(self.bins)}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "ExpertTable":
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode="r"), [tuple(r) for r in meta["ranges"]])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", type=str, nargs="*", default=["data_final.csv"],
+                    help="CSVs usados como amostra para escolher a resolução e medir o erro")
+    ap.add_argument("--out", type=str, default="expert_table.npy")
+    ap.add_argument("--max_fallback", type=float, default=0.05,
+                    help="fração máxima da amostra caindo em células ambíguas")
+    ap.add_argument("--bins", type=int, default=None, help="fixa a resolução em vez de escolher")
+    args = ap.parse_args()
+
+    sample = np.concatenate([pd.read_csv(p)[FEATURES].values.astype(np.float32) for p in args.data])
+    if args.bins:
+        table = ExpertTable.compile((args.bins,) * 4)
+        rep = table.report(sample)
+    else:
+        table, reps = ExpertTable.auto_compile(sample, args.max_fallback)
+        rep = reps[-1]
+    table.save(args.out)
+    print(json.dumps(rep, indent=2))
+    print(f"tabela salva em {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,31 @@
+import math
+import os
 import random
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Optional, Tuple, Dict, Any, List
 import numpy as np
+from seeding import env_seeds
 
-try:
-    import pygame
-except Exception:
-    pygame = None
+# pygame só é importado no primeiro render() (ou em `from game_env import pygame`),
+# para que workers headless não paguem o import nem o banner no stdout.
+_pygame = None
+_pygame_loaded = False
+
+def _load_pygame():
+    global _pygame, _pygame_loaded
+    if not _pygame_loaded:
+        try:
+            import pygame
+            _pygame = pygame
+        except Exception:
+            _pygame = None
+        _pygame_loaded = True
+    return _pygame
+
+def __getattr__(name):
+    if name == "pygame":
+        return _load_pygame()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 @dataclass
 class Config:
@@ -24,6 +43,74 @@ class Config:
     seed: Optional[int] = None
     vy_min: float = -12
     vy_max: float = 12
+    frame_skip: int = 1     # ticks de física por step(); a ação vale só no primeiro tick
+
+PIPE_MARGIN = 90   # centro do gap sorteado em [PIPE_MARGIN, height - PIPE_MARGIN]
+
+
+class CourseTable:
+    """
+    Percursos pré-sorteados: gaps[e, j] é o centro do gap do j-ésimo cano do
+    episódio e (int16). A linha e é exatamente o que o FlappyEnv sortearia após
+    reset(seed=seeding.env_seeds(seed, [e])[0]), então avaliar vários modelos no
+    mesmo CourseTable dá números aleatórios comuns sem nenhuma chamada ao RNG.
+    """
+    def __init__(self, gaps: np.ndarray):
+        self.gaps = gaps
+
+    def __len__(self) -> int:
+        return self.gaps.shape[0]
+
+    def row(self, episode: int) -> Tuple[int, ...]:
+        return tuple(self.gaps[episode % len(self)].tolist())
+
+    @staticmethod
+    def pipes_per_episode(cfg: Config) -> int:
+        # 2 canos iniciais + um a cada (interval + 40) px percorridos, com folga
+        return 3 + math.ceil(cfg.max_steps * cfg.pipe_speed / (cfg.pipe_interval_px + 40))
+
+    @classmethod
+    def generate(cls, seed: int, episodes: int, cfg: Config = Config()) -> "CourseTable":
+        n_pipes = cls.pipes_per_episode(cfg)
+        hi = cfg.height - PIPE_MARGIN
+        gaps = np.empty((episodes, n_pipes), dtype=np.int16)
+        for e, s in enumerate(env_seeds(seed, range(episodes))):
+            rng = random.Random(s)
+            gaps[e] = [rng.randint(PIPE_MARGIN, hi) for _ in range(n_pipes)]
+        return cls(gaps)
+
+    @classmethod
+    def load(cls, seed: int, episodes: int, cfg: Config = Config(), cache_dir: str = "courses") -> "CourseTable":
+        """Gera (uma vez) e abre do disco via memmap; o arquivo é compartilhado entre processos."""
+        n_pipes = cls.pipes_per_episode(cfg)
+        path = os.path.join(cache_dir, f"course_h{cfg.height}_p{n_pipes}_s{seed}_e{episodes}.npy")
+        if not os.path.exists(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, cls.generate(seed, episodes, cfg).gaps)
+            os.replace(tmp, path)
+        return cls(np.load(path, mmap_mode="r"))
+
+
+class EnvState:
+    """Snapshot compacto de um FlappyEnv (ver FlappyEnv.get_state/set_state)."""
+    __slots__ = ("y", "vy", "pipes", "near", "steps", "score", "rng_state",
+                 "course_gaps", "course_pos", "course_episode")
+
+    def __init__(self, y, vy, pipes, near, steps, score, rng_state,
+                 course_gaps=(), course_pos=0, course_episode=0):
+        self.y = y
+        self.vy = vy
+        self.pipes = pipes          # tupla de (x, gap_y), do mais à esquerda ao mais à direita
+        self.near = near            # índice em pipes do cano mais próximo
+        self.steps = steps
+        self.score = score
+        self.rng_state = rng_state
+        self.course_gaps = course_gaps
+        self.course_pos = course_pos
+        self.course_episode = course_episode
+
 
 class FlappyEnv:
     """
@@ -34,97 +121,219 @@ class FlappyEnv:
         x3 = delta_gap_norm      (-1..1) centro do gap - y, normalizado por altura
     Ação: 0 = nada | 1 = pular
     Recompensa (usada só para referência durante coleta): +0.1 vivo, +1 ao passar cano, -1 colisão.
+    Com `course`, o k-ésimo reset usa a linha k do CourseTable em vez de sortear os gaps.
     """
-    def __init__(self, cfg: Config = Config()):
+    def __init__(self, cfg: Config = Config(), course: Optional[CourseTable] = None):
         self.cfg = cfg
         self.rng = random.Random(cfg.seed)
+        self.course = course
+        self._course_gaps: Tuple[int, ...] = ()
+        self._course_pos = 0
+        self._course_episode = 0
         self.y = 0.0
         self.vy = 0.0
-        self.pipes: List[Tuple[float, float]] = []
+        # canos num ring buffer de capacidade fixa, em ordem crescente de x:
+        # sequências _head <= _near <= _tail indexam slots (seq % capacidade)
+        span = cfg.width + 80 + cfg.pipe_interval_px + cfg.pipe_width
+        self._cap = int(span // cfg.pipe_interval_px) + 2
+        self._px = [0.0] * self._cap
+        self._pgy = [0.0] * self._cap
+        self._head = 0
+        self._near = 0   # primeiro cano com x + pipe_width >= player_x - 1
+        self._tail = 0
+        self._precompute()
+        self._obs_buf = np.empty(4, dtype=np.float32)
         self.steps = 0
         self.score = 0
         self.screen = None
         self.clock = None
         self.font = None
 
-    def reset(self) -> Tuple[np.ndarray, Dict[str, Any]]:
+    @property
+    def pipes(self) -> List[Tuple[float, float]]:
+        cap = self._cap
+        return [(self._px[i % cap], self._pgy[i % cap]) for i in range(self._head, self._tail)]
+
+    def get_state(self) -> EnvState:
+        """Captura física, canos, contadores e estado do RNG (sem handles do pygame)."""
+        return EnvState(self.y, self.vy, tuple(self.pipes), self._near - self._head,
+                        self.steps, self.score, self.rng.getstate(),
+                        self._course_gaps, self._course_pos, self._course_episode)
+
+    def set_state(self, state: EnvState):
+        """Restaura um snapshot; os próximos step() repetem exatamente o mesmo futuro."""
+        if len(state.pipes) > self._cap:
+            raise ValueError("snapshot tem mais canos que a capacidade deste env")
+        self.y = state.y
+        self.vy = state.vy
+        for i, (x, gy) in enumerate(state.pipes):
+            self._px[i] = x
+            self._pgy[i] = gy
+        self._head = 0
+        self._near = state.near
+        self._tail = len(state.pipes)
+        self.steps = state.steps
+        self.score = state.score
+        self.rng.setstate(state.rng_state)
+        self._course_gaps = state.course_gaps
+        self._course_pos = state.course_pos
+        self._course_episode = state.course_episode
+
+    def clone(self) -> "FlappyEnv":
+        """Cópia independente do env (mesmo cfg) para rollouts de lookahead."""
+        env = type(self)(self.cfg, self.course)
+        env.set_state(self.get_state())
+        return env
+
+    def reset(self, seed: Optional[int] = None, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """`seed` re-semeia o sorteio dos canos (ver seeding.episode_rngs)."""
+        if seed is not None:
+            self.rng.seed(seed)
+        self._precompute()
         self.y = self.cfg.height * 0.5
         self.vy = 0.0
         self.steps = 0
         self.score = 0
-        self.pipes.clear()
+        self._head = self._near = self._tail = 0
+        if self.course is not None:
+            self._course_gaps = self.course.row(self._course_episode)
+            self._course_pos = 0
+            self._course_episode += 1
         self._spawn_pipe(self.cfg.width + 80)
         self._spawn_pipe(self.cfg.width + 80 + self.cfg.pipe_interval_px)
-        return self._obs(), {"score": self.score}
+        return self._obs(out), {"score": self.score}
+
+    def _precompute(self):
+        # constantes derivadas do Config (recalculadas a cada reset caso o cfg mude)
+        cfg = self.cfg
+        self._half_gap = cfg.pipe_gap / 2
+        self._half_size = cfg.player_size / 2
+        self._near_edge = cfg.player_x - 1
+        self._spawn_below = cfg.width - cfg.pipe_interval_px
+        self._vy_scale = max(1e-6, cfg.vy_max)
+
+    def step(self, action: int, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, bool, Dict[str, Any]]:
+        """`out` (float32, shape (4,)) recebe a observação sem alocar um array novo."""
+        if self.cfg.frame_skip > 1:
+            return self.step_n(action, self.cfg.frame_skip, out)
+        reward, done = self._tick(action)
+        return self._obs(out), reward, done, {"score": self.score}
 
-    def step(self, action: int) -> Tuple[np.ndarray, float, bool, Dict[str, Any]]:
+    def step_n(self, action: int, k: int, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, bool, Dict[str, Any]]:
+        """
+        Aplica `action` no primeiro tick e avança até k ticks (para antes se o
+        episódio terminar). Devolve só a observação final, a soma das
+        recompensas e se houve término em algum tick.
+        """
+        reward, done = self._tick(action)
+        for _ in range(k - 1):
+            if done:
+                break
+            r, done = self._tick(0)
+            reward += r
+        return self._obs(out), reward, done, {"score": self.score}
+
+    def _tick(self, action: int) -> Tuple[float, bool]:
+        cfg = self.cfg
         if action == 1:
-            self.vy = self.cfg.flap_impulse
-        self.vy += self.cfg.gravity
-        self.vy = max(self.cfg.vy_min, min(self.vy, self.cfg.vy_max))
+            self.vy = cfg.flap_impulse
+        self.vy += cfg.gravity
+        self.vy = max(cfg.vy_min, min(self.vy, cfg.vy_max))
         self.y += self.vy
 
+        px, pgy, cap = self._px, self._pgy, self._cap
+        speed, pw, player_x = cfg.pipe_speed, cfg.pipe_width, cfg.player_x
+
+        # só canos a partir do mais próximo podem cruzar player_x neste passo
         passed_reward = 0.0
-        new_pipes = []
-        for (x, gy) in self.pipes:
-            x2 = x - self.cfg.pipe_speed
-            if x + self.cfg.pipe_width >= self.cfg.player_x and x2 + self.cfg.pipe_width < self.cfg.player_x:
+        i = self._near
+        while i < self._tail:
+            x = px[i % cap]
+            if (x - speed) + pw >= player_x:
+                break
+            if x + pw >= player_x:
                 self.score += 1
                 passed_reward += 1.0
-            if x2 + self.cfg.pipe_width > 0:
-                new_pipes.append((x2, gy))
-        self.pipes = new_pipes
+            i += 1
+        for i in range(self._head, self._tail):
+            px[i % cap] -= speed
+        while self._head < self._tail and px[self._head % cap] + pw <= 0:
+            self._head += 1
 
-        if len(self.pipes) == 0 or (self.pipes[-1][0] < self.cfg.width - self.cfg.pipe_interval_px):
-            self._spawn_pipe(self.cfg.width + 40)
+        if self._head == self._tail or px[(self._tail - 1) % cap] < self._spawn_below:
+            self._spawn_pipe(cfg.width + 40)
+
+        near = max(self._near, self._head)
+        while near < self._tail and px[near % cap] + pw < self._near_edge:
+            near += 1
+        self._near = near
 
         done = False
         reward = 0.1 + passed_reward
 
-        if self.y < 0 or self.y > self.cfg.height:
+        if self.y < 0 or self.y > cfg.height:
             reward -= 1.0
             done = True
         else:
-            for (x, gy) in self.pipes:
-                if self.cfg.player_x + self.cfg.player_size > x and self.cfg.player_x < x + self.cfg.pipe_width:
-                    gap_top = gy - self.cfg.pipe_gap / 2
-                    gap_bottom = gy + self.cfg.pipe_gap / 2
-                    player_top = self.y - self.cfg.player_size / 2
-                    player_bottom = self.y + self.cfg.player_size / 2
-                    if player_top < gap_top or player_bottom > gap_bottom:
+            # canos anteriores a _near já estão à esquerda do jogador
+            i = near
+            while i < self._tail:
+                x = px[i % cap]
+                if not player_x + cfg.player_size > x:
+                    break
+                if player_x < x + pw:
+                    gy = pgy[i % cap]
+                    if self.y - self._half_size < gy - self._half_gap or self.y + self._half_size > gy + self._half_gap:
                         reward -= 1.0
                         done = True
                         break
+                i += 1
 
         self.steps += 1
-        if self.steps >= self.cfg.max_steps:
+        if self.steps >= cfg.max_steps:
             done = True
 
-        return self._obs(), reward, done, {"score": self.score}
+        return reward, done
 
     def _spawn_pipe(self, x: float):
-        margin = 90
-        gy = self.rng.randint(margin, self.cfg.height - margin)
-        self.pipes.append((x, float(gy)))
+        if self._course_pos < len(self._course_gaps):
+            gy = self._course_gaps[self._course_pos]
+            self._course_pos += 1
+        else:
+            gy = self.rng.randint(PIPE_MARGIN, self.cfg.height - PIPE_MARGIN)
+        if self._tail - self._head >= self._cap:
+            raise RuntimeError("ring buffer de canos cheio; aumente pipe_interval_px")
+        slot = self._tail % self._cap
+        self._px[slot] = x
+        self._pgy[slot] = float(gy)
+        self._tail += 1
 
     def _nearest_pipe(self) -> Tuple[float, float]:
-        candidates = [(x, gy) for (x, gy) in self.pipes if x + self.cfg.pipe_width >= self.cfg.player_x - 1]
-        if not candidates:
+        if self._near >= self._tail:
             return float(self.cfg.width), self.cfg.height * 0.5
-        x, gy = min(candidates, key=lambda t: t[0])
-        dist_right = max(0.0, (x + self.cfg.pipe_width) - self.cfg.player_x)
-        return dist_right, gy
+        slot = self._near % self._cap
+        dist_right = max(0.0, (self._px[slot] + self.cfg.pipe_width) - self.cfg.player_x)
+        return dist_right, self._pgy[slot]
 
-    def _obs(self) -> np.ndarray:
+    def _obs(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        # escreve direto em `out`; sem ele, no buffer interno e devolve uma cópia
+        # (o chamador pode guardar a observação entre passos)
+        # (clamps com if/else: max(lo, min(hi, v)) custa duas chamadas por feature)
         dist_right, gy = self._nearest_pipe()
-        y_norm = self.y / self.cfg.height
-        vy_norm = max(-1.0, min(1.0, self.vy / max(1e-6, self.cfg.vy_max)))
-        dist_norm = max(0.0, min(1.0, dist_right / self.cfg.width))
-        delta_gap_norm = max(-1.0, min(1.0, (gy - self.y) / self.cfg.height))
-        return np.array([y_norm, vy_norm, dist_norm, delta_gap_norm], dtype=np.float32)
+        height = self.cfg.height
+        buf = self._obs_buf if out is None else out
+        buf[0] = self.y / height
+        v = self.vy / self._vy_scale
+        buf[1] = -1.0 if v < -1.0 else 1.0 if v > 1.0 else v
+        v = dist_right / self.cfg.width
+        buf[2] = 0.0 if v < 0.0 else 1.0 if v > 1.0 else v
+        v = (gy - self.y) / height
+        buf[3] = -1.0 if v < -1.0 else 1.0 if v > 1.0 else v
+        return buf.copy() if out is None else out
 
     # ------------ Render (só para avaliação/jogo humano) ------------
     def render(self):
+        pygame = _load_pygame()
         if pygame is None:
             raise RuntimeError("Pygame não instalado.")
         if self.screen is None:
@@ -154,6 +363,207 @@ class FlappyEnv:
         self.clock.tick(60)
 
     def close(self):
-        if self.screen is not None and pygame is not None:
-            pygame.quit()
+        if self.screen is not None and _pygame is not None:
+            _pygame.quit()
             self.screen = None
+
+
+class VecFlappyEnv:
+    """
+    N pistas independentes de FlappyEnv simuladas como arrays NumPy.
+
+    Cada pista i se comporta exatamente como FlappyEnv(Config(..., seed=seeds[i])):
+    mesma física em float64, mesmos sorteios de gap (um random.Random por pista)
+    e mesma observação (N,4) float32 de _obs(). Pistas que terminam são
+    resetadas automaticamente; a observação final e o score do episódio
+    encerrado ficam em info["terminal_obs"] (só nos passos em que alguma pista
+    terminou) e info["score"]. Com `course`, cada episódio iniciado (em qualquer
+    pista) consome a próxima linha do CourseTable.
+
+    pipe_gap, pipe_speed, gravity e flap_impulse são arrays (N,) e podem variar
+    por pista (ver from_configs), para varrer dificuldades numa só passada.
+    """
+    LANE_FIELDS = ("pipe_gap", "pipe_speed", "gravity", "flap_impulse")
+
+    def __init__(self, num_envs: int, cfg: Config = Config(), seeds: Optional[List[Optional[int]]] = None,
+                 course: Optional[CourseTable] = None):
+        self.cfg = cfg
+        self.course = course
+        self.num_envs = n = int(num_envs)
+        if seeds is None:
+            seeds = [None if cfg.seed is None else cfg.seed + i for i in range(n)]
+        if len(seeds) != n:
+            raise ValueError(f"esperava {n} seeds, recebi {len(seeds)}")
+        self.rngs = [random.Random(s) for s in seeds]
+        # canos vivos ocupam no máximo a faixa (-pipe_width, width + 80 + interval]
+        span = cfg.width + 80 + cfg.pipe_interval_px + cfg.pipe_width
+        self.capacity = k = int(span // cfg.pipe_interval_px) + 2
+        self.y = np.zeros(n, dtype=np.float64)
+        self.vy = np.zeros(n, dtype=np.float64)
+        self.pipe_x = np.zeros((n, k), dtype=np.float64)
+        self.pipe_gy = np.zeros((n, k), dtype=np.float64)
+        self.pipe_alive = np.zeros((n, k), dtype=bool)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self._course_row = np.zeros(n, dtype=np.int64)
+        self._course_pos = np.zeros(n, dtype=np.int64)
+        self._course_next = 0
+        for name in self.LANE_FIELDS:
+            setattr(self, name, np.full(n, float(getattr(cfg, name)), dtype=np.float64))
+
+    @classmethod
+    def from_configs(cls, cfgs: List[Config], seeds: Optional[List[Optional[int]]] = None,
+                     course: Optional[CourseTable] = None) -> "VecFlappyEnv":
+        """Uma pista por Config; só os campos de LANE_FIELDS (e seed) podem diferir."""
+        base = cfgs[0]
+        same = {name: getattr(base, name) for name in cls.LANE_FIELDS}
+        for c in cfgs[1:]:
+            if replace(c, seed=base.seed, **same) != base:
+                raise ValueError(f"pistas só podem diferir em {cls.LANE_FIELDS}: {c}")
+        env = cls(len(cfgs), base, seeds=[c.seed for c in cfgs] if seeds is None else seeds, course=course)
+        for name in cls.LANE_FIELDS:
+            setattr(env, name, np.array([float(getattr(c, name)) for c in cfgs], dtype=np.float64))
+        return env
+
+    def reset(self, seeds: Optional[List[Optional[int]]] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+        if seeds is not None:
+            if len(seeds) != self.num_envs:
+                raise ValueError(f"esperava {self.num_envs} seeds, recebi {len(seeds)}")
+            for rng, s in zip(self.rngs, seeds):
+                rng.seed(s)
+        self._reset_lanes(np.arange(self.num_envs))
+        return self._obs(), {"score": self.score.copy()}
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        if self.cfg.frame_skip > 1:
+            return self.step_n(actions, self.cfg.frame_skip)
+        rewards, dones = self._tick(np.asarray(actions))
+        return self._finish(rewards, dones)
+
+    def step_n(self, actions, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Versão em lote de FlappyEnv.step_n: pistas que terminam ficam congeladas até o fim dos k ticks."""
+        rewards, dones = self._tick(np.asarray(actions))
+        noop = np.zeros(self.num_envs, dtype=np.int64)
+        for _ in range(k - 1):
+            active = ~dones
+            if not active.any():
+                break
+            r, d = self._tick(noop, active)
+            rewards += r
+            dones |= d
+        return self._finish(rewards, dones)
+
+    def _tick(self, actions: np.ndarray, active: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        cfg = self.cfg
+        vy = np.where(actions == 1, self.flap_impulse, self.vy)
+        vy += self.gravity
+        np.clip(vy, cfg.vy_min, cfg.vy_max, out=vy)
+        y = self.y + vy
+
+        alive = self.pipe_alive
+        x = self.pipe_x
+        x2 = x - self.pipe_speed[:, None]
+        passed = alive & (x + cfg.pipe_width >= cfg.player_x) & (x2 + cfg.pipe_width < cfg.player_x)
+        keep = x2 + cfg.pipe_width > 0
+        if active is not None:
+            vy = np.where(active, vy, self.vy)
+            y = np.where(active, y, self.y)
+            x2 = np.where(active[:, None], x2, x)
+            passed &= active[:, None]
+            keep |= ~active[:, None]
+        self.vy, self.y = vy, y
+        n_passed = passed.sum(axis=1)
+        self.score += n_passed
+        alive &= keep
+        self.pipe_x = x2
+
+        last_x = np.where(alive, x2, -np.inf).max(axis=1)
+        spawn = last_x < cfg.width - cfg.pipe_interval_px
+        if active is not None:
+            spawn &= active
+        self._spawn(np.flatnonzero(spawn), cfg.width + 40)
+
+        rewards = 0.1 + n_passed.astype(np.float64)
+        out_of_bounds = (self.y < 0) | (self.y > cfg.height)
+        half_gap = (self.pipe_gap / 2)[:, None]
+        half_size = cfg.player_size / 2
+        x, gy = self.pipe_x, self.pipe_gy
+        overlap = alive & (cfg.player_x + cfg.player_size > x) & (cfg.player_x < x + cfg.pipe_width)
+        player_top = (self.y - half_size)[:, None]
+        player_bottom = (self.y + half_size)[:, None]
+        hit = (overlap & ((player_top < gy - half_gap) | (player_bottom > gy + half_gap))).any(axis=1)
+        crashed = out_of_bounds | hit
+        rewards[crashed] -= 1.0
+        if active is None:
+            self.steps += 1
+        else:
+            self.steps += active
+            crashed &= active
+            rewards[~active] = 0.0
+        dones = crashed | (self.steps >= cfg.max_steps)
+        if active is not None:
+            dones &= active
+        return rewards, dones
+
+    def _finish(self, rewards: np.ndarray, dones: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        obs = self._obs()
+        info = {"score": self.score.copy(), "steps": self.steps.copy()}
+        finished = np.flatnonzero(dones)
+        if finished.size:
+            info["terminal_obs"] = obs.copy()
+            self._reset_lanes(finished)
+            obs[finished] = self._obs(finished)
+        return obs, rewards, dones, info
+
+    def _reset_lanes(self, idx: np.ndarray):
+        cfg = self.cfg
+        self.y[idx] = cfg.height * 0.5
+        self.vy[idx] = 0.0
+        self.steps[idx] = 0
+        self.score[idx] = 0
+        self.pipe_alive[idx] = False
+        if self.course is not None:
+            self._course_row[idx] = (self._course_next + np.arange(len(idx))) % len(self.course)
+            self._course_pos[idx] = 0
+            self._course_next += len(idx)
+        self._spawn(idx, cfg.width + 80)
+        self._spawn(idx, cfg.width + 80 + cfg.pipe_interval_px)
+
+    def _spawn(self, idx: np.ndarray, x: float):
+        if len(idx) == 0:
+            return
+        slots = np.argmin(self.pipe_alive[idx], axis=1)
+        self.pipe_x[idx, slots] = x
+        if self.course is None:
+            gy = [float(self.rngs[i].randint(PIPE_MARGIN, self.cfg.height - PIPE_MARGIN)) for i in idx]
+        else:
+            pos = self._course_pos[idx]
+            gy = np.empty(len(idx), dtype=np.float64)
+            in_table = pos < self.course.gaps.shape[1]
+            gy[in_table] = self.course.gaps[self._course_row[idx[in_table]], pos[in_table]]
+            for j in np.flatnonzero(~in_table):
+                gy[j] = self.rngs[idx[j]].randint(PIPE_MARGIN, self.cfg.height - PIPE_MARGIN)
+            self._course_pos[idx] = pos + 1
+        self.pipe_gy[idx, slots] = gy
+        self.pipe_alive[idx, slots] = True
+
+    def _obs(self, lanes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Observações (N,4) float32, ou (len(lanes),4) só das pistas `lanes`."""
+        cfg = self.cfg
+        if lanes is None:
+            x, alive, pipe_gy, y, vy = self.pipe_x, self.pipe_alive, self.pipe_gy, self.y, self.vy
+        else:
+            x, alive, pipe_gy, y, vy = self.pipe_x[lanes], self.pipe_alive[lanes], self.pipe_gy[lanes], \
+                self.y[lanes], self.vy[lanes]
+        candidates = alive & (x + cfg.pipe_width >= cfg.player_x - 1)
+        nearest = np.argmin(np.where(candidates, x, np.inf), axis=1)
+        has_pipe = candidates.any(axis=1)
+        rows = np.arange(len(x))
+        dist_right = np.where(has_pipe, np.maximum(0.0, (x[rows, nearest] + cfg.pipe_width) - cfg.player_x), float(cfg.width))
+        gy = np.where(has_pipe, pipe_gy[rows, nearest], cfg.height * 0.5)
+        obs = np.empty((len(x), 4), dtype=np.float32)
+        obs[:, 0] = y / cfg.height
+        obs[:, 1] = np.clip(vy / max(1e-6, cfg.vy_max), -1.0, 1.0)
+        obs[:, 2] = np.clip(dist_right / cfg.width, 0.0, 1.0)
+        obs[:, 3] = np.clip((gy - y) / cfg.height, -1.0, 1.0)
+        return obs
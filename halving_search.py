@@ -0,0 +1,177 @@
+"""
+Busca por successive halving (ou Hyperband) no grid do run_experiments.
+
+Cada configuração começa com uma fração pequena do orçamento (episódios coletados e
+épocas de treino); a cada rodada ("rung") só a fração 1/eta melhor, pela val_acc
+(ou pelo score em rollout), sobe para um orçamento eta vezes maior, até o orçamento
+cheio do grid. Os run_id são os mesmos do run_experiments.
+
+Uso:
+    python halving_search.py --eta 3 --rungs 3
+    python halving_search.py --hyperband --workers 4
+    python halving_search.py --rank rollout --rollout_episodes 20
+"""
+import argparse
+import csv
+import math
+import os
+import time
+import numpy as np
+import parallel_train
+import run_experiments as rx
+from sweep_difficulty import linear_batch, score_vs_gap
+
+HALVING_FIELDS = ["bracket", "rung", "budget", "run_id", *rx.CONFIG_FIELDS, "episodes_used", "epochs_used",
+                  "score", "val_acc", "status"]
+
+
+def budget_config(cfg: dict, frac: float, min_episodes: int = 5, min_epochs: int = 5) -> dict:
+    """O config com episódios e épocas reduzidos a `frac` do valor do grid."""
+    return dict(cfg, episodes=max(min_episodes, round(cfg["episodes"] * frac)),
+                epochs=max(min_epochs, round(cfg["epochs"] * frac)))
+
+
+def evaluate_group(key, runs, opts, rollout):
+    """
+    Treina um grupo (run_experiments.run_group) e devolve {run_id: (score, val_acc, pack)}.
+    score é a val_acc média dos folds, ou o score médio em rollout nos gaps de `rollout`.
+    """
+    out = {}
+    for run_id, lr, epochs, w, b, mean, std, acc_va, acc_std in rx.run_group(*key, runs, opts):
+        pack = {"w": w, "b": b, "mean": mean, "std": std}
+        score = float(acc_va)
+        if rollout:
+            table = score_vs_gap(rollout["gaps"], rollout["episodes"], linear_batch(pack), rollout["seed"],
+                                 rollout["max_steps"])
+            score = float(np.mean([row["score_mean"] for row in table]))
+        out[run_id] = (score, float(acc_va), pack)
+    return out
+
+
+def evaluate(configs, ids, frac, opts, rollout, pool):
+    """
+    Avalia os configs `ids` com a fração `frac` do orçamento. Configs que só diferem em
+    lr/epochs compartilham dataset e treinam em lote (um grupo por tarefa do pool).
+    Devolve ({run_id: (score, val_acc, pack)}, {run_id: config reduzido}).
+    """
+    used = {rid: budget_config(configs[rid], frac) for rid in ids}
+    groups = {}
+    for rid, c in used.items():
+        groups.setdefault((c["episodes"], c["gap"], c["epsilon"], c["poly"]), []).append((rid, c["lr"], c["epochs"]))
+    keys = list(groups)
+    # rungs altos têm poucos grupos: os processos que sobram treinam os folds de cada um
+    fold_workers = 1 if pool is None else max(1, opts["workers"] // len(keys))
+    group_opts = [dict(opts, lrs=sorted({lr for _, lr, _ in groups[k]}), epochs=sorted({ep for _, _, ep in groups[k]}),
+                       fold_workers=fold_workers) for k in keys]
+    if pool is None:
+        parts = [evaluate_group(k, groups[k], o, rollout) for k, o in zip(keys, group_opts)]
+    else:
+        parts = pool.map(evaluate_group, keys, [groups[k] for k in keys], group_opts, [rollout] * len(keys))
+    results = {}
+    for part in parts:
+        results.update(part)
+    return results, used
+
+
+def successive_halving(configs, ids, rungs, eta, opts, rollout, pool, bracket=0, start=0, log=print):
+    """
+    Uma rodada de successive halving sobre `ids`, do rung `start` até o último
+    (orçamento cheio). Devolve (melhor run_id, (score, val_acc, pack), linhas do relatório, custo).
+    O custo soma episódios x épocas de cada treino, a mesma conta usada para o grid inteiro.
+    """
+    alive = sorted(ids)
+    rows, cost = [], 0
+    for rung in range(start, rungs):
+        frac = float(eta) ** (rung - (rungs - 1))
+        t0 = time.perf_counter()
+        results, used = evaluate(configs, alive, frac, opts, rollout, pool)
+        cost += sum(c["episodes"] * c["epochs"] for c in used.values())
+        # empate (comum nos scores de rollout): maior val_acc, depois menor run_id
+        ranked = sorted(alive, key=lambda rid: (-results[rid][0], -results[rid][1], rid))
+        last = rung == rungs - 1
+        keep = ranked if last else ranked[:max(1, len(ranked) // eta)]
+        for pos, rid in enumerate(ranked):
+            score, acc, _ = results[rid]
+            status = ("melhor" if pos == 0 else "final") if last else ("promovido" if pos < len(keep) else "podado")
+            rows.append({"bracket": bracket, "rung": rung, "budget": f"{frac:.4f}", "run_id": rid, **configs[rid],
+                         "episodes_used": used[rid]["episodes"], "epochs_used": used[rid]["epochs"],
+                         "score": f"{score:.4f}", "val_acc": f"{acc:.4f}", "status": status})
+        pruned = ranked[len(keep):]
+        log(f"[bracket {bracket} rung {rung}] orçamento {frac:.3f}: {len(ranked)} configs em "
+            f"{time.perf_counter() - t0:.1f}s, melhor run {ranked[0]} ({results[ranked[0]][0]:.4f})"
+            + ("" if last else f"; {len(keep)} seguem, podados: {' '.join(map(str, pruned))}"))
+        alive = keep
+    return alive[0], results[alive[0]], rows, cost
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out_dir", type=str, default="runs")
+    ap.add_argument("--eta", type=int, default=3, help="fator de poda/aumento de orçamento entre rungs")
+    ap.add_argument("--rungs", type=int, default=3, help="número de rungs; o último usa o orçamento cheio")
+    ap.add_argument("--hyperband", action="store_true",
+                    help="vários brackets, do mais agressivo (todos os configs, orçamento mínimo) ao sem poda")
+    ap.add_argument("--rank", choices=["val_acc", "rollout"], default="val_acc")
+    ap.add_argument("--rollout_episodes", type=int, default=20, help="episódios por gap no --rank rollout")
+    ap.add_argument("--rollout_gaps", type=int, nargs="+", default=rx.GAPS)
+    ap.add_argument("--max_steps", type=int, default=2000)
+    ap.add_argument("--folds", type=int, default=3, help="k-fold da val_acc em cada avaliação")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--data_seed", choices=["shared", "per_run"], default="shared")
+    ap.add_argument("--cache_dir", type=str, default="data_cache", help="cache de datasets ('' desliga)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="processos (BLAS com 1 thread cada); 1 = tudo neste processo")
+    args = ap.parse_args()
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    configs = rx.grid_configs()
+    opts = {"seed": args.seed, "data_seed": args.data_seed, "cache_dir": args.cache_dir, "compact": False,
+            "compact_bins": 0, "solver": "gd", "folds": args.folds, "workers": args.workers}
+    # seeds de rollout diferentes das de coleta: o score mede percursos que o modelo não viu
+    rollout = None if args.rank == "val_acc" else {"gaps": args.rollout_gaps, "episodes": args.rollout_episodes,
+                                                   "seed": args.seed + 10_000, "max_steps": args.max_steps}
+    # brackets (s = rungs pulados): s=0 é o successive halving com todos os configs; no Hyperband
+    # os brackets seguintes começam mais alto com menos configs sorteados (~mesmo custo cada)
+    brackets = range(args.rungs) if args.hyperband else [0]
+    rng = np.random.default_rng(args.seed)
+    pool = parallel_train.pinned_pool(args.workers) if args.workers > 1 else None
+    t0 = time.perf_counter()
+    try:
+        best, rows, cost = None, [], 0
+        for s in brackets:
+            n = min(len(configs), math.ceil(len(configs) * args.rungs / (args.rungs - s) / args.eta ** s))
+            ids = sorted(configs) if n == len(configs) else sorted(rng.choice(sorted(configs), n, replace=False).tolist())
+            rid, res, bracket_rows, bracket_cost = successive_halving(
+                configs, ids, args.rungs, args.eta, opts, rollout, pool, bracket=s, start=s)
+            rows += bracket_rows
+            cost += bracket_cost
+            if best is None or (res[0], res[1], -rid) > (best[1][0], best[1][1], -best[0]):
+                best = (rid, res)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    report = os.path.join(args.out_dir, "halving.csv")
+
+    def write(f):
+        wr = csv.DictWriter(f, fieldnames=HALVING_FIELDS)
+        wr.writeheader()
+        wr.writerows(rows)
+    rx._atomic_write(report, write)
+    rid, (score, acc, pack) = best
+    best_copy = os.path.join(args.out_dir, "best_weights.npy")
+    rx._atomic_write(best_copy, lambda f: np.save(f, pack, allow_pickle=True), "wb")
+
+    # custo do grid inteiro (run_experiments) na mesma unidade: episódios x épocas por treino
+    full = sum(c["episodes"] * c["epochs"] for c in configs.values())
+    c = configs[rid]
+    print(f"\n✓ Melhor: run {rid} (ep={c['episodes']} gap={c['gap']} eps={c['epsilon']} lr={c['lr']} "
+          f"epc={c['epochs']} poly={c['poly']}) val_acc={acc:.4f}"
+          + (f" rollout={score:.2f}" if rollout else "") + f" | salvo em {best_copy}")
+    print(f"custo: {cost} episódios x épocas vs {full} do grid completo ({cost / full:.1%}) | "
+          f"{time.perf_counter() - t0:.1f}s")
+    print(f"Podas por rung: {report}")
+
+
+if __name__ == "__main__":
+    main()
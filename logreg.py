@@ -0,0 +1,312 @@
+"""
+Núcleo de treino da regressão logística (d pequeno: 4 features, 14 com
+poly_features grau 2).
+
+GDTrainer: o GD de passo fixo de sempre, em float32 e sem alocar nada por época.
+fit():     solvers de segunda ordem. Newton/IRLS usa a Hessiana (d+1)x(d+1) inteira,
+           L-BFGS só gradientes; os dois param por tolerância no gradiente e costumam
+           convergir em poucas passadas sobre os dados, contra 50–100 épocas do GD.
+
+Usado por train_logreg.py e run_experiments.train_logreg_numpy.
+"""
+from typing import Optional, Tuple
+import numpy as np
+
+SOLVERS = ("gd", "newton", "lbfgs")
+
+
+class GDTrainer:
+    """
+    GD full-batch em float32 com buffers pré-alocados: cada step() só escreve em z,
+    t, u e no gradiente (ufuncs com out=), e b é um escalar float32 em vez de um float
+    do Python que promoveria as contas para float64. A loss (BCE pela log-sigmoide
+    estável, fundida com o gradiente sobre o mesmo z) só é calculada quando pedida.
+
+    Sem mean/std, X já vem padronizado e cada época é um produto sobre X inteiro.
+    Com mean/std, X é o dataset cru (pode ser memmap): cada época percorre blocos de
+    block_rows linhas, copiando e padronizando só o bloco, então não existe cópia
+    padronizada do dataset. `mask` marca as linhas de treino; as outras entram com
+    peso zero (sem gather por época).
+
+    models=K (só com mean/std) treina K modelos de uma vez sobre os mesmos blocos: w vira
+    (K, d), b (K, 1), z/t/u (K, linhas), e o lr de step()/apply() pode ser um (K, 1) por
+    modelo (o sub-grid lr x epochs do run_experiments).
+    """
+    def __init__(self, X: np.ndarray, y: np.ndarray, sample_weight: Optional[np.ndarray] = None,
+                 mean: Optional[np.ndarray] = None, std: Optional[np.ndarray] = None,
+                 mask: Optional[np.ndarray] = None, block_rows: int = 1 << 16,
+                 weight_sum: Optional[float] = None, models: int = 1):
+        """
+        weight_sum: total pelo qual pesos/contagens são normalizados (padrão: o deste X).
+        Um shard de um dataset maior passa o total do dataset, e os gradientes dos
+        shards somados dão o gradiente do dataset inteiro.
+        """
+        self.streaming = mean is not None
+        if models > 1 and not self.streaming:
+            raise ValueError("models > 1 exige mean/std (modo por blocos)")
+        self.models = models
+        self.X = X if self.streaming else np.ascontiguousarray(X, dtype=np.float32)
+        n, d = self.X.shape
+        self.y = np.ascontiguousarray(np.asarray(y).reshape(-1), dtype=np.float32)
+        self.inv_n = np.float32(1.0 / (n if weight_sum is None else weight_sum))
+        if sample_weight is None and mask is None:
+            self.sw = None
+        else:
+            # pesos por linha já normalizados (soma 1 no treino, 0 fora da máscara)
+            if sample_weight is None:
+                sw = np.ones(n, dtype=np.float32)
+            else:
+                sw = np.array(sample_weight, dtype=np.float32).reshape(-1)
+            if mask is not None:
+                sw *= np.asarray(mask, dtype=bool)
+            sw /= sw.sum(dtype=np.float64) if weight_sum is None else weight_sum
+            self.sw = sw
+        lead = () if models == 1 else (models,)   # eixo dos modelos só quando há vários
+        self.w = np.zeros(lead + (d,), dtype=np.float32)
+        self.b = np.float32(0.0) if models == 1 else np.zeros((models, 1), dtype=np.float32)
+        rows = min(block_rows, n) if self.streaming else n
+        self.block_rows = rows
+        if self.streaming:
+            self.mean = np.asarray(mean, dtype=np.float32).reshape(-1)
+            self.std = np.asarray(std, dtype=np.float32).reshape(-1)
+            # bloco transposto (d, linhas): padronização e produtos correm ao longo das
+            # linhas contíguas; em (linhas, d) o laço interno teria só d elementos
+            self.xb = np.empty((d, rows), dtype=np.float32)
+            self.mean, self.std = self.mean.reshape(-1, 1), self.std.reshape(-1, 1)
+        self.z = np.empty(lead + (rows,), dtype=np.float32)
+        self.t = np.empty(lead + (rows,), dtype=np.float32)
+        self.u = np.empty(lead + (rows,), dtype=np.float32)
+        self.gw = np.empty(lead + (d,), dtype=np.float32)
+        self.gsum = np.empty(lead + (d,), dtype=np.float32)
+        self.gb = np.empty((models, 1), dtype=np.float32)
+
+    def _standardized(self, X, a: int, b: int, mask=None) -> np.ndarray:
+        """Linhas [a, b) de X (só as de `mask`, se dada), padronizadas e transpostas: (d, k)."""
+        rows = X[a:b] if mask is None else np.compress(mask[a:b], X[a:b], axis=0)
+        xb = self.xb[:, :len(rows)]
+        np.copyto(xb, rows.T)
+        xb -= self.mean
+        xb /= self.std
+        return xb
+
+    def _blocks(self):
+        """(x, y, pesos) de treino por bloco; sem streaming, um bloco só (o próprio X, em (n, d))."""
+        if not self.streaming:
+            yield self.X, self.y, self.sw
+            return
+        for a in range(0, len(self.X), self.block_rows):
+            b = min(a + self.block_rows, len(self.X))
+            yield self._standardized(self.X, a, b), self.y[a:b], None if self.sw is None else self.sw[a:b]
+
+    def _loss(self, z, y, sw):
+        """Soma (ponderada) da BCE em z: max(z,0) - y z + log1p(exp(-|z|)); (K,) com vários modelos."""
+        t, u = self.t[..., :z.shape[-1]], self.u[..., :z.shape[-1]]
+        np.abs(z, out=t)
+        np.negative(t, out=t)
+        np.exp(t, out=t)
+        np.log1p(t, out=t)
+        np.maximum(z, 0.0, out=u)
+        t += u
+        np.multiply(y, z, out=u)
+        t -= u
+        s = t.sum(axis=-1, dtype=np.float64) * self.inv_n if sw is None else t @ sw
+        return float(s) if self.models == 1 else s
+
+    def gradient(self, with_loss: bool = False) -> Tuple[np.ndarray, np.float32, Optional[float]]:
+        """
+        (dL/dw, dL/db, loss ou None) nos pesos atuais; dL/dw (e dL/db com vários modelos)
+        são buffers internos.
+        """
+        loss = 0.0
+        gb = np.float32(0.0)
+        self.gsum[:] = 0.0
+        self.gb[:] = 0.0
+        for xb, yb, swb in self._blocks():
+            k = len(yb)
+            z, t = self.z[..., :k], self.t[..., :k]
+            if self.streaming:
+                np.matmul(self.w, xb, out=z)
+            else:
+                np.matmul(xb, self.w, out=z)
+            z += self.b
+            if with_loss:
+                loss += self._loss(z, yb, swb)
+            # sigmoid(z) = (1 + tanh(z/2)) / 2: sem overflow em exp(-z)
+            np.multiply(z, 0.5, out=t)
+            np.tanh(t, out=t)
+            t *= 0.5
+            t += 0.5
+            t -= yb
+            if swb is None:
+                t *= self.inv_n
+            else:
+                t *= swb
+            if self.models > 1:
+                np.matmul(t, xb.T, out=self.gw)
+                self.gb += t.sum(axis=1, keepdims=True, dtype=np.float32)
+            elif self.streaming:
+                np.matmul(xb, t, out=self.gw)
+            else:
+                np.matmul(t, xb, out=self.gw)
+            self.gsum += self.gw
+            if self.models == 1:
+                gb += t.sum(dtype=np.float32)
+        return self.gsum, gb if self.models == 1 else self.gb, loss if with_loss else None
+
+    def apply(self, gw: np.ndarray, gb, lr):
+        """Passo de GD com um gradiente já calculado (aqui ou somado entre shards)."""
+        if self.models == 1:
+            lr = np.float32(lr)
+            gw *= lr
+            self.w -= gw
+            self.b -= lr * np.float32(gb)
+            return
+        lr = np.asarray(lr, dtype=np.float32).reshape(-1, 1)
+        gw *= lr
+        self.w -= gw
+        gb *= lr
+        self.b -= gb
+
+    def step(self, lr: float, with_loss: bool = False) -> Optional[float]:
+        """Uma época de GD; devolve a loss de antes do passo se with_loss."""
+        gw, gb, loss = self.gradient(with_loss)
+        self.apply(gw, gb, lr)
+        return loss
+
+    def predict(self, X: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Probabilidades (n, 1), ou (n, K) com vários modelos. Sem streaming, X já padronizado;
+        com streaming, X cru (padronizado por bloco) e só as linhas de `mask`, se dada.
+        """
+        if not self.streaming:
+            z = X @ self.w.reshape(-1, 1) + self.b
+            return 0.5 * (1.0 + np.tanh(0.5 * z))
+        out = [self.w @ self._standardized(X, a, min(a + self.block_rows, len(X)), mask) + self.b
+               for a in range(0, len(X), self.block_rows)]
+        z = np.concatenate(out, axis=-1) if out else np.zeros(self.b.shape[:1] + (0,), dtype=np.float32)
+        p = 0.5 * (1.0 + np.tanh(0.5 * z))
+        return p.reshape(-1, 1) if self.models == 1 else p.T
+
+    def weights(self) -> Tuple[np.ndarray, np.float32]:
+        """(w (d, 1), b) ou, com vários modelos, (W (K, d), B (K, 1)), copiados."""
+        if self.models == 1:
+            return self.w.reshape(-1, 1).copy(), self.b
+        return self.w.copy(), self.b.copy()
+
+
+class _Objective:
+    """BCE média (ponderada) + l2/2 |w|^2 em theta = [w; b], com log-sigmoide estável."""
+    def __init__(self, X: np.ndarray, y: np.ndarray, sample_weight: Optional[np.ndarray] = None, l2: float = 0.0):
+        self.X = X
+        self.y = np.asarray(y, dtype=np.float64).reshape(-1)
+        sw = np.ones(len(X)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64).reshape(-1)
+        self.sw = sw / sw.sum()
+        self.l2 = l2
+        self.d = X.shape[1]
+        self.passes = 0
+
+    def _z(self, theta):
+        self.passes += 1
+        return self.X @ theta[:self.d] + theta[self.d]
+
+    def loss_grad(self, theta) -> Tuple[float, np.ndarray, np.ndarray]:
+        """(loss, gradiente, p) numa passada."""
+        z = self._z(theta)
+        # log(1+e^z) - y z  ==  BCE com p = sigmoid(z), sem log(0)
+        loss = float(self.sw @ (np.logaddexp(0.0, z) - self.y * z))
+        p = 0.5 * (1.0 + np.tanh(0.5 * z))
+        r = self.sw * (p - self.y)
+        grad = np.empty(self.d + 1)
+        grad[:self.d] = self.X.T @ r
+        grad[self.d] = r.sum()
+        w = theta[:self.d]
+        grad[:self.d] += self.l2 * w
+        return loss + 0.5 * self.l2 * float(w @ w), grad, p
+
+    def hessian(self, p) -> np.ndarray:
+        self.passes += 1
+        h = self.sw * p * (1.0 - p)
+        H = np.empty((self.d + 1, self.d + 1))
+        H[:self.d, :self.d] = (self.X * h[:, None]).T @ self.X
+        H[:self.d, self.d] = H[self.d, :self.d] = self.X.T @ h
+        H[self.d, self.d] = h.sum()
+        H[:self.d, :self.d] += self.l2 * np.eye(self.d)
+        return H
+
+
+def _newton(f: _Objective, theta, tol, max_iter):
+    """Newton amortecido: se a loss subir, volta ao ponto anterior com meio passo."""
+    loss, g, p = f.loss_grad(theta)
+    for it in range(1, max_iter + 1):
+        if np.abs(g).max() < tol:
+            return theta, loss, it - 1, True
+        H = f.hessian(p)
+        H[np.diag_indices_from(H)] += 1e-10   # dados separáveis numa direção não viram matriz singular
+        step = np.linalg.solve(H, g)
+        t = 1.0
+        while True:
+            cand = theta - t * step
+            c_loss, c_g, c_p = f.loss_grad(cand)
+            if c_loss <= loss or t < 1e-8:
+                break
+            t *= 0.5
+        theta, loss, g, p = cand, c_loss, c_g, c_p
+    return theta, loss, max_iter, np.abs(g).max() < tol
+
+
+def _lbfgs(f: _Objective, theta, tol, max_iter, memory=10):
+    """L-BFGS (recursão de dois laços) com busca linear de Armijo por backtracking."""
+    loss, g, _ = f.loss_grad(theta)
+    S, Y = [], []
+    for it in range(1, max_iter + 1):
+        if np.abs(g).max() < tol:
+            return theta, loss, it - 1, True
+        q = g.copy()
+        alphas = []
+        for s, y in zip(reversed(S), reversed(Y)):
+            a = (s @ q) / (y @ s)
+            alphas.append(a)
+            q -= a * y
+        if S:
+            q *= (S[-1] @ Y[-1]) / (Y[-1] @ Y[-1])
+        for (s, y), a in zip(zip(S, Y), reversed(alphas)):
+            q += s * (a - (y @ q) / (y @ s))
+        direction = -q
+        slope = g @ direction
+        if slope >= 0:   # aproximação perdeu a positividade: recomeça pelo gradiente
+            S, Y = [], []
+            direction, slope = -g, -(g @ g)
+        t = 1.0
+        while True:
+            cand = theta + t * direction
+            c_loss, c_g, _ = f.loss_grad(cand)
+            if c_loss <= loss + 1e-4 * t * slope or t < 1e-10:
+                break
+            t *= 0.5
+        s, y = cand - theta, c_g - g
+        if s @ y > 1e-12:
+            S.append(s)
+            Y.append(y)
+            if len(S) > memory:
+                S.pop(0)
+                Y.pop(0)
+        theta, loss, g = cand, c_loss, c_g
+    return theta, loss, max_iter, np.abs(g).max() < tol
+
+
+def fit(X: np.ndarray, y: np.ndarray, solver: str = "newton", sample_weight: Optional[np.ndarray] = None,
+        tol: float = 1e-6, max_iter: int = 100, l2: float = 0.0) -> Tuple[np.ndarray, float, dict]:
+    """
+    Ajusta (w (d,1) float32, b float) em X já padronizado. info traz iterações,
+    passadas sobre os dados (avaliações de loss/gradiente), loss final e convergência.
+    """
+    f = _Objective(X, y, sample_weight, l2)
+    theta = np.zeros(f.d + 1)
+    if solver == "newton":
+        theta, loss, iters, ok = _newton(f, theta, tol, max_iter)
+    elif solver == "lbfgs":
+        theta, loss, iters, ok = _lbfgs(f, theta, tol, max_iter)
+    else:
+        raise ValueError(f"solver desconhecido: {solver} (use um de {SOLVERS[1:]})")
+    info = {"iters": iters, "passes": f.passes, "loss": loss, "converged": bool(ok)}
+    return theta[:f.d].astype(np.float32).reshape(-1, 1), float(theta[f.d]), info
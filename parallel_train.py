@@ -0,0 +1,192 @@
+"""
+GD data-parallel da regressão logística sobre um pool de processos.
+
+X (cru), y, a máscara de treino e os pesos por linha são copiados uma vez para
+multiprocessing.shared_memory; cada worker mapeia os mesmos blocos (sem cópia),
+calcula gradiente e loss do seu shard com um logreg.GDTrainer e o coordenador
+soma os parciais, sempre na ordem dos shards, antes de dar o passo.
+map_shared() usa a mesma cópia compartilhada para rodar tarefas inteiras (p.ex.
+os folds de uma validação cruzada) em paralelo sobre os mesmos dados, e
+pinned_pool() é o pool persistente, com BLAS em 1 thread por worker, do grid.
+
+Usado por train_logreg.py --workers N e run_experiments (cross_validate e o grid).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional
+import numpy as np
+import logreg
+
+
+# variáveis lidas pelas bibliotecas BLAS/OpenMP ao carregar (antes do import do numpy)
+BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                    "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def _pinned_init(initializer, initargs):
+    try:   # opcional: também limita bibliotecas já carregadas
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def pinned_pool(workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()) -> ProcessPoolExecutor:
+    """
+    ProcessPoolExecutor (spawn) com BLAS em 1 thread por worker: N processos x N threads
+    do BLAS disputariam os mesmos N núcleos. As variáveis de ambiente ficam fixadas neste
+    processo, mas o BLAS dele já foi carregado e não muda; só os workers as leem.
+    """
+    for var in BLAS_THREAD_VARS:
+        os.environ[var] = "1"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_pinned_init, initargs=(initializer, initargs))
+
+
+class SharedArrays:
+    """Arrays copiados para shared_memory; spec() diz aos workers como reabri-los."""
+    def __init__(self, **arrays: np.ndarray):
+        self._shms = {}
+        self.arrays = {}
+        for key, arr in arrays.items():
+            arr = np.asarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+            view[...] = arr
+            self._shms[key] = shm
+            self.arrays[key] = view
+
+    def spec(self) -> dict:
+        return {k: (self._shms[k].name, a.shape, a.dtype.str) for k, a in self.arrays.items()}
+
+    def close(self):
+        self.arrays = {}
+        for shm in self._shms.values():
+            shm.close()
+            shm.unlink()
+        self._shms = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_WORKER = {}   # estado de cada processo do pool (preenchido por _init_shared/_init_worker)
+
+
+def _init_shared(spec: dict):
+    # filhos do pool usam o resource_tracker do coordenador: registrar de novo o mesmo nome
+    # não cria dono novo, e o unlink em SharedArrays.close() continua sendo o único
+    shms = {k: shared_memory.SharedMemory(name=name) for k, (name, _, _) in spec.items()}
+    arrays = {}
+    for k, (_, shape, dt) in spec.items():
+        arrays[k] = np.ndarray(shape, dtype=dt, buffer=shms[k].buf)
+        arrays[k].flags.writeable = False   # os dados são de todos os workers
+    _WORKER.update(shms=shms, arrays=arrays)
+
+
+def _init_worker(spec: dict, mean, std, weight_sum: float, block_rows: int):
+    _init_shared(spec)
+    _WORKER.update(mean=mean, std=std, weight_sum=weight_sum, block_rows=block_rows, trainers={})
+
+
+def _call_shared(job):
+    fn, kwargs = job
+    return fn(**_WORKER["arrays"], **kwargs)
+
+
+def map_shared(fn: Callable, jobs: List[dict], workers: int = 1, **arrays: Optional[np.ndarray]) -> list:
+    """
+    [fn(**arrays, **job) for job in jobs] num pool de `workers` processos. Os arrays
+    (None = omitido) vão uma vez para shared_memory e cada worker os lê sem cópia,
+    somente leitura; `fn` precisa ser uma função de módulo (pickle). Resultados na
+    ordem de `jobs`.
+    """
+    arrays = {k: a for k, a in arrays.items() if a is not None}
+    if workers <= 1 or len(jobs) <= 1:
+        return [fn(**arrays, **job) for job in jobs]
+    with SharedArrays(**arrays) as shared:
+        # fork (início rápido); _pinned_init limita o BLAS herdado a 1 thread quando há threadpoolctl
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_pinned_init,
+                                 initargs=(_init_shared, (shared.spec(),))) as pool:
+            return list(pool.map(_call_shared, [(fn, job) for job in jobs]))
+
+
+def _shard_gradient(job):
+    """Gradiente e loss parciais do shard [a, b) nos pesos (w, bias)."""
+    a, b, w, bias, with_loss = job
+    tr = _WORKER["trainers"].get((a, b))
+    if tr is None:
+        arr = _WORKER["arrays"]
+        tr = logreg.GDTrainer(arr["X"][a:b], arr["y"][a:b], arr["sw"][a:b] if "sw" in arr else None,
+                              mean=_WORKER["mean"], std=_WORKER["std"],
+                              mask=arr["mask"][a:b] if "mask" in arr else None,
+                              block_rows=_WORKER["block_rows"], weight_sum=_WORKER["weight_sum"])
+        _WORKER["trainers"][(a, b)] = tr
+    tr.w[:] = w
+    tr.b = np.float32(bias)
+    gw, gb, loss = tr.gradient(with_loss)
+    return gw.copy(), gb, loss
+
+
+class ParallelGD:
+    """
+    Mesma interface de logreg.GDTrainer em modo por blocos (step/predict/weights),
+    com o gradiente de cada época somado entre `shards` faixas de linhas processadas
+    por `workers` processos. Use como context manager (libera pool e shared_memory).
+    """
+    def __init__(self, X: np.ndarray, y: np.ndarray, sample_weight: Optional[np.ndarray] = None,
+                 mean: np.ndarray = None, std: np.ndarray = None, mask: Optional[np.ndarray] = None,
+                 workers: int = 2, shards: Optional[int] = None, block_rows: int = 1 << 16):
+        n = len(X)
+        # o coordenador guarda os pesos do modelo e responde predict() sobre o X original
+        self.local = logreg.GDTrainer(X, y, sample_weight, mean=mean, std=std, mask=mask, block_rows=block_rows)
+        arrays = {"X": np.asarray(X, dtype=np.float32), "y": np.asarray(y, dtype=np.float32).reshape(-1)}
+        if sample_weight is not None:
+            arrays["sw"] = np.asarray(sample_weight, dtype=np.float32).reshape(-1)
+        if mask is not None:
+            arrays["mask"] = np.asarray(mask, dtype=bool)
+        if sample_weight is None:
+            weight_sum = float(n if mask is None else np.count_nonzero(mask))
+        else:
+            sw = arrays["sw"].astype(np.float64)
+            weight_sum = float(sw.sum() if mask is None else sw[arrays["mask"]].sum())
+        self.shared = SharedArrays(**arrays)
+        bounds = np.linspace(0, n, (shards or workers) + 1).astype(int)
+        self.ranges = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(self.shared.spec(), self.local.mean, self.local.std, weight_sum, block_rows))
+
+    def step(self, lr: float, with_loss: bool = False) -> Optional[float]:
+        w, b = self.local.w.copy(), float(self.local.b)
+        parts = list(self.pool.map(_shard_gradient, [(a, z, w, b, with_loss) for a, z in self.ranges]))
+        gw = np.zeros_like(self.local.w)
+        gb = np.float32(0.0)
+        for part_w, part_b, _ in parts:   # ordem fixa dos shards: resultado não depende do escalonamento
+            gw += part_w
+            gb += part_b
+        self.local.apply(gw, gb, lr)
+        return sum(p[2] for p in parts) if with_loss else None
+
+    def predict(self, X: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        return self.local.predict(X, mask)
+
+    def weights(self):
+        return self.local.weights()
+
+    def close(self):
+        self.pool.shutdown()
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
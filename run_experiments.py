@@ -1,12 +1,21 @@
-import os, csv, math, time, argparse, itertools, random
+import os, csv, math, time, argparse, itertools, hashlib, inspect, json, shutil
 import numpy as np
+from concurrent.futures import as_completed
 from typing import Tuple
 from game_env import FlappyEnv, Config
 from expert_policy import expert_action
+from seeding import episode_rngs
+import dataset_io
+import logreg
+import parallel_train
+
+# arquivos cujo código muda o dataset coletado (entram na chave do cache, junto com
+# o código de collect_array: ruído epsilon e rótulos)
+DATA_CODE_FILES = ["game_env.py", "expert_policy.py", "seeding.py"]
 
 # ---------- util ----------
-def sigmoid(z): return 1.0/(1.0+np.exp(-z))
-def accuracy(y_true, y_prob, thr=0.5): return np.mean((y_prob >= thr) == y_true)
+def sigmoid(z): return 0.5*(1.0+np.tanh(0.5*z))   # = 1/(1+e^-z), sem overflow em exp
+def accuracy(y_true, y_prob, thr=0.5, weights=None): return np.average((y_prob >= thr) == y_true, weights=weights)
 
 def poly_features(X: np.ndarray, degree: int) -> np.ndarray:
     if degree <= 1: return X
@@ -21,98 +30,395 @@ def poly_features(X: np.ndarray, degree: int) -> np.ndarray:
             feats.append((X[:, [i]] * X[:, [j]]))
     return np.concatenate(feats, axis=1)
 
-def train_logreg_numpy(X, y, lr=0.1, epochs=60) -> Tuple[np.ndarray, float, np.ndarray, np.ndarray]:
-    # normaliza
-    mean = X.mean(axis=0, keepdims=True); std = X.std(axis=0, keepdims=True) + 1e-6
-    Xn = (X - mean)/std
-    # split train/val
-    idx = np.arange(len(Xn)); np.random.shuffle(idx)
-    cut = int(0.8*len(Xn))
-    tr, va = idx[:cut], idx[cut:]
-    Xtr, ytr = Xn[tr], y[tr].reshape(-1,1)
-    Xva, yva = Xn[va], y[va].reshape(-1,1)
-    # pesos
-    w = np.zeros((Xtr.shape[1],1), dtype=np.float32); b = 0.0
+def _stats(X, sw=None, stats=None):
+    # média/desvio (1, d) float32: Welford em pedaços, ou ponderados pelas contagens do coreset.
+    # stats: RunningStats de X já calculado (p.ex. o guardado no .fds do cache), sem passada nos dados
+    if sw is None:
+        st = dataset_io.array_stats(X) if stats is None else stats
+        return st.mean.reshape(1,-1).astype(np.float32), st.std.reshape(1,-1).astype(np.float32) + 1e-6
+    mean = np.average(X, axis=0, weights=sw[:,0]).reshape(1,-1).astype(np.float32)
+    std = np.sqrt(np.average((X - mean)**2, axis=0, weights=sw[:,0])).reshape(1,-1).astype(np.float32) + 1e-6
+    return mean, std
+
+def _split(n, seed=None, folds=1, fold=0):
+    # permutação do split: idx[:cut] treino, idx[cut:] val. folds=1: 80/20;
+    # folds=k: a mesma permutação em k partes, com a parte `fold` como validação
+    perm = np.random.default_rng(seed).permutation(n)
+    if folds <= 1:
+        return perm, int(0.8*n)
+    parts = np.array_split(perm, folds)
+    va = parts.pop(fold)
+    return np.concatenate(parts + [va]), n - len(va)
+
+def _prepare(X, y, seed=None, sample_weight=None, folds=1, fold=0, val=None, stats=None):
+    # normaliza e separa treino/val (ver _split): (Xtr, ytr, Xva, yva, wtr, wva, mean, std).
+    # Com val=(Xva, yva), X inteiro é treino e a validação são essas linhas (sem pesos)
+    sw = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float32).reshape(-1,1)
+    mean, std = _stats(X, sw, stats)
+    # uma cópia só: linhas já na ordem do split (treino | val), padronizadas no lugar
+    if val is None:
+        idx, cut = _split(len(X), seed, folds, fold)
+        Xn = np.asarray(X[idx], dtype=np.float32)
+        yp = np.asarray(y, dtype=np.float32)[idx].reshape(-1,1)
+        wtr, wva = (None, None) if sw is None else (sw[idx[:cut]], sw[idx[cut:]])
+    else:
+        cut = len(X)
+        Xn = np.concatenate([X, val[0]]).astype(np.float32, copy=False)
+        yp = np.concatenate([np.asarray(y).reshape(-1), np.asarray(val[1]).reshape(-1)]).astype(np.float32).reshape(-1,1)
+        wtr, wva = sw, None
+    Xn -= mean; Xn /= std
+    return Xn[:cut], yp[:cut], Xn[cut:], yp[cut:], wtr, wva, mean, std
+
+def train_logreg_numpy(X, y, lr=0.1, epochs=60, seed=None, sample_weight=None, solver="gd", tol=1e-6,
+                       max_iter=100, folds=1, fold=0, val=None, stats=None) -> Tuple[np.ndarray, float, np.ndarray, np.ndarray]:
+    # sample_weight: pesos inteiros por linha (ex.: dataset_io.compact); None = todos 1
+    # solver: "gd" (lr/epochs) ou "newton"/"lbfgs" (logreg.fit, para por tol)
+    # folds/fold: validação no fold `fold` de `folds` (ver _split); folds=1 é o 80/20
+    # val=(Xva, yva): treina em X inteiro e valida nessas linhas (ex.: X é o coreset do treino)
+    # stats: média/desvio de X já calculados (ver _stats)
+    if solver != "gd":
+        Xtr, ytr, Xva, yva, wtr, wva, mean, std = _prepare(X, y, seed, sample_weight, folds, fold, val, stats)
+        w, b, _ = logreg.fit(Xtr, ytr, solver, sample_weight=wtr, tol=tol, max_iter=max_iter)
+        p_va = sigmoid((Xva @ w + b))
+        return w, b, mean, std, accuracy(yva, p_va, weights=wva)
+    # GD: X fica como está; o trainer padroniza bloco a bloco só as linhas de treino
+    sw = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float32).reshape(-1,1)
+    mean, std = _stats(X, sw, stats)
+    if val is None:
+        idx, cut = _split(len(X), seed, folds, fold)
+        train = np.zeros(len(X), dtype=bool); train[idx[:cut]] = True
+    else:
+        train = None
+    trainer = logreg.GDTrainer(X, y, sw, mean=mean, std=std, mask=train)
     for ep in range(1, epochs+1):
-        z = Xtr @ w + b; p = sigmoid(z)
-        dz = (p - ytr)/len(Xtr)
-        dw = Xtr.T @ dz; db = dz.sum()
-        w -= lr*dw; b -= lr*db
+        trainer.step(lr)
+    w, b = trainer.weights()
     # aval
-    p_va = sigmoid((Xva @ w + b))
-    acc_va = accuracy(yva, p_va)
+    if val is None:
+        p_va = trainer.predict(X, ~train)
+        acc_va = accuracy(np.asarray(y, dtype=np.float32)[~train].reshape(-1,1), p_va,
+                          weights=None if sw is None else sw[~train])
+    else:
+        acc_va = accuracy(np.asarray(val[1], dtype=np.float32).reshape(-1,1), trainer.predict(val[0]))
     return w, b, mean, std, acc_va
 
+def train_logreg_grid(X, y, lrs, epochs, seed=None, sample_weight=None, folds=1, fold=0, val=None, stats=None):
+    """
+    GD de len(lrs) modelos ao mesmo tempo num logreg.GDTrainer com models=K: os pesos
+    ficam numa matriz W (K, d) e um único produto por bloco de dados serve a todos. X
+    fica cru (pode ser memmap) e é padronizado bloco a bloco, sem cópia do dataset nem
+    buffers novos por época. Cada modelo é copiado ao atingir cada valor de `epochs`
+    (60 e 100 compartilham as 60 primeiras), então o sub-grid lr x epochs custa ~um
+    treino de max(epochs) épocas. stats: RunningStats de X já calculado (ver _stats).
+    Devolve {(lr, ep): (w, b, mean, std, acc_va)}, igual (a menos de arredondamento
+    do BLAS) a train_logreg_numpy(X, y, lr, ep, seed, sample_weight) para cada par.
+    """
+    sw = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float32).reshape(-1,1)
+    mean, std = _stats(X, sw, stats)
+    if val is None:
+        idx, cut = _split(len(X), seed, folds, fold)
+        train = np.zeros(len(X), dtype=bool); train[idx[:cut]] = True
+        Xva, va = X, ~train
+        yva = np.asarray(y, dtype=np.float32)[~train].reshape(-1,1)
+        wva = None if sw is None else sw[~train]
+    else:
+        train, (Xva, yva), va, wva = None, val, None, None
+        yva = np.asarray(yva, dtype=np.float32).reshape(-1,1)
+    K = len(lrs)
+    trainer = logreg.GDTrainer(X, y, sw, mean=mean, std=std, mask=train, models=K)
+    lr = np.asarray(lrs, dtype=np.float32).reshape(-1,1) if K > 1 else lrs[0]
+    stops = set(epochs)
+    out = {}
+    for ep in range(1, max(epochs)+1):
+        trainer.step(lr)
+        if ep in stops:
+            W, B = trainer.weights()
+            W, B = W.reshape(K, -1), np.reshape(B, (K, 1))
+            P_va = trainer.predict(Xva, va)
+            for k, lr_k in enumerate(lrs):
+                acc_va = accuracy(yva, P_va[:, [k]], weights=wva)
+                out[(lr_k, ep)] = (W[k].reshape(-1,1).copy(), B[k, 0], mean, std, acc_va)
+    return out
+
+def _fit_fold(X, y, sample_weight=None, lrs=(None,), epochs=(None,), seed=None, solver="gd", folds=1, fold=0,
+              compact_bins=None, poly=1, stats=None):
+    # um fold de um grupo de runs: {(lr, ep): (w, b, mean, std, acc_va)}.
+    # stats: RunningStats de X inteiro (ver _stats); não vale para o coreset, que usa os pesos
+    # compact_bins (0 = dedup exato, k = grade k^4): o split vem antes e só as linhas de
+    # treino viram coreset; a validação fica nas linhas brutas. Aí X chega cru (4 features)
+    # e poly_features é aplicado aqui, depois do coreset
+    val = None
+    if compact_bins is not None:
+        idx, cut = _split(len(X), seed, folds, fold)
+        y = np.asarray(y, dtype=np.float32)
+        val = (poly_features(np.asarray(X[idx[cut:]]), poly), y[idx[cut:]])
+        X, y, sample_weight = dataset_io.compact(X[idx[:cut]], y[idx[:cut]], bins=compact_bins or None)
+        X, y = poly_features(X, poly), y.astype(np.float32)
+        stats = None
+    if solver == "gd":
+        return train_logreg_grid(X, y, lrs, epochs, seed, sample_weight, folds=folds, fold=fold, val=val, stats=stats)
+    return {(None, None): train_logreg_numpy(X, y, seed=seed, sample_weight=sample_weight, solver=solver,
+                                             folds=folds, fold=fold, val=val, stats=stats)}
+
+def cross_validate(X, y, lrs, epochs, seed=None, sample_weight=None, solver="gd", folds=5, workers=1,
+                   compact_bins=None, poly=1, stats=None):
+    """
+    Validação cruzada k-fold de um grupo de runs (o sub-grid lr x epochs treina em lote
+    dentro de cada fold). Os folds rodam em paralelo em `workers` processos sobre uma
+    cópia só de X/y em shared_memory (parallel_train.map_shared), então com workers >= folds
+    o tempo fica perto do de um treino. No grid, run_group recebe os processos que não
+    estão ocupados com outros grupos. Todos os folds saem da mesma permutação (seed).
+    compact_bins/poly: coreset do treino em cada fold (ver _fit_fold). stats: ver _stats.
+    Devolve {(lr, ep): (w, b, mean, std, acc_mean, acc_std)}, com os pesos do fold 0.
+    """
+    jobs = [dict(lrs=lrs, epochs=epochs, seed=seed, solver=solver, folds=folds, fold=k, compact_bins=compact_bins,
+                 poly=poly, stats=stats) for k in range(folds)]
+    per_fold = parallel_train.map_shared(_fit_fold, jobs, workers, X=X, y=y, sample_weight=sample_weight)
+    out = {}
+    for key, first in per_fold[0].items():
+        accs = [res[key][4] for res in per_fold]
+        out[key] = first[:4] + (float(np.mean(accs)), float(np.std(accs)))
+    return out
+
 def collect_array(episodes=80, gap=150, epsilon=0.1, seed=42):
-    random.seed(seed); np.random.seed(seed)
     env = FlappyEnv(Config(pipe_gap=gap, seed=seed))
     X_list = []; y_list = []
-    for _ in range(episodes):
-        obs, _ = env.reset(); done = False
+    for ep in range(episodes):
+        env_seed, noise = episode_rngs(seed, ep)
+        obs, _ = env.reset(seed=env_seed); done = False
         while not done:
             a = expert_action(obs)
-            if np.random.rand() < epsilon: a = np.random.randint(0,2)
+            if noise.random() < epsilon: a = int(noise.integers(0,2))
             X_list.append(obs.copy()); y_list.append(a)
             obs, r, done, info = env.step(a)
     X = np.array(X_list, dtype=np.float32); y = np.array(y_list, dtype=np.float32)
     return X, y
 
+def data_code_version() -> str:
+    h = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in DATA_CODE_FILES:
+        with open(os.path.join(here, name), "rb") as f:
+            h.update(f.read())
+    h.update(inspect.getsource(collect_array).encode())
+    return h.hexdigest()[:12]
+
+def dataset_key(episodes, gap, epsilon, seed) -> str:
+    params = {"episodes": episodes, "gap": gap, "epsilon": epsilon, "seed": seed, "code": data_code_version()}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+def cache_path(episodes, gap, epsilon, seed, cache_dir="data_cache") -> str:
+    return os.path.join(cache_dir, f"{dataset_key(episodes, gap, epsilon, seed)}.fds")
+
+def cached_collect(episodes=80, gap=150, epsilon=0.1, seed=42, cache_dir="data_cache"):
+    """
+    collect_array com cache em disco endereçado por conteúdo (um .fds por chave). A
+    média/desvio das features vão junto no meta.json (dataset_io.feature_stats(cache_path(...))).
+    """
+    path = cache_path(episodes, gap, epsilon, seed, cache_dir)
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return dataset_io.load_xy(path)
+    X, y = collect_array(episodes=episodes, gap=gap, epsilon=epsilon, seed=seed)
+    # grava num diretório temporário e renomeia: leitores nunca veem um .fds pela metade
+    tmp = f"{path}.{os.getpid()}.tmp"
+    info = {"episodes": episodes, "gap": gap, "epsilon": epsilon, "seed": seed,
+            "code": data_code_version(), "policy": "expert"}
+    with dataset_io.DatasetWriter(tmp, extras=(), info=info) as wr:
+        wr.append_batch(X, y.astype(np.uint8))
+    dataset_io.save_stats(tmp, dataset_io.array_stats(X))
+    try:
+        os.rename(tmp, path)
+    except OSError:   # outro processo gravou a mesma chave antes
+        shutil.rmtree(tmp, ignore_errors=True)
+    return X, y
+
 # ---------- grid ----------
+# hiperparâmetros (grid leve e eficiente)
+EPISODES = [60, 120, 200]
+GAPS     = [170, 150, 130]        # 170 = fácil; 130 = mais difícil
+EPSILONS = [0.05, 0.15]           # ruído na política (generalização)
+LRS      = [0.05, 0.1]
+EPOCHS   = [60, 100]
+POLY     = [1, 2]                 # grau das features
+
+SUMMARY_FIELDS = ["run_id","episodes","gap","epsilon","lr","epochs","poly","val_acc","val_acc_std","folds",
+                  "weights_path"]
+CONFIG_FIELDS = ["episodes","gap","epsilon","lr","epochs","poly"]
+
+def grid_configs(lrs=LRS, epochs=EPOCHS):
+    """{run_id: config} do grid, numerados na ordem de itertools.product (a dos arquivos em runs/)."""
+    return {run_id: dict(zip(CONFIG_FIELDS, values)) for run_id, values in enumerate(itertools.product(
+        EPISODES, GAPS, EPSILONS, lrs, epochs, POLY
+    ), start=1)}
+
+def run_group(episodes, gap, epsilon, poly, runs, opts):
+    """
+    Treina um grupo de runs que só diferem em lr/epochs (mesmo dataset e split) e
+    devolve [(run_id, lr, epochs, w, b, mean, std, acc_va, acc_std)]. Roda num worker
+    do grid, então não grava nada em out_dir: quem grava é o processo principal.
+    """
+    first = runs[0][0]
+    data_seed = opts["seed"] if opts["data_seed"] == "shared" else opts["seed"] + first
+    stats = None
+    if opts["cache_dir"]:
+        X, y = cached_collect(episodes=episodes, gap=gap, epsilon=epsilon, seed=data_seed, cache_dir=opts["cache_dir"])
+        if poly == 1 and not opts["compact"]:
+            # média/desvio guardados no .fds: sem passada nos dados a cada grupo
+            stats = dataset_io.feature_stats(cache_path(episodes, gap, epsilon, data_seed, opts["cache_dir"]))
+    else:
+        X, y = collect_array(episodes=episodes, gap=gap, epsilon=epsilon, seed=data_seed)
+    # com compact, o coreset sai só do treino de cada fold (e poly vem depois dele, em _fit_fold)
+    coreset = dict(compact_bins=opts["compact_bins"], poly=poly) if opts["compact"] else {}
+    if poly > 1 and not opts["compact"]:
+        X = poly_features(X, degree=poly)
+    # um fold (80/20) ou validação cruzada; opts["fold_workers"]: processos para os folds deste
+    # grupo (os que sobram quando há menos grupos que workers; 1 = folds em série)
+    if opts["folds"] > 1:
+        results = cross_validate(X, y, opts["lrs"], opts["epochs"], seed=opts["seed"]+first,
+                                 solver=opts["solver"], folds=opts["folds"], workers=opts.get("fold_workers", 1),
+                                 stats=stats, **coreset)
+    else:
+        results = {k: r + (0.0,) for k, r in _fit_fold(X, y, None, opts["lrs"], opts["epochs"], seed=opts["seed"]+first,
+                                                       solver=opts["solver"], stats=stats, **coreset).items()}
+    return [(run_id, lr, epochs) + results[(lr, epochs)] for run_id, lr, epochs in runs]
+
+def _atomic_write(path, write, mode="w"):
+    # grava num temporário e renomeia: um crash nunca deixa o arquivo pela metade
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, mode) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_results(results_dir, settings):
+    """Runs já concluídos no store (um run_<id>.json por run) com as mesmas configurações globais."""
+    done = {}
+    for name in os.listdir(results_dir):
+        if not (name.startswith("run_") and name.endswith(".json")):
+            continue
+        with open(os.path.join(results_dir, name)) as f:
+            rec = json.load(f)
+        if rec.get("settings") == settings and os.path.exists(rec["weights_path"]):
+            done[rec["run_id"]] = rec
+    return done
+
+def write_summary(summary_path, records):
+    def write(f):
+        wr = csv.writer(f)
+        wr.writerow(SUMMARY_FIELDS)
+        for rec in sorted(records, key=lambda r: r["run_id"]):
+            wr.writerow([f"{rec[k]:.4f}" if k.startswith("val_acc") else rec[k] for k in SUMMARY_FIELDS])
+    _atomic_write(summary_path, write)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--out_dir", type=str, default="runs")
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--cache_dir", type=str, default="data_cache", help="cache de datasets ('' desliga)")
+    ap.add_argument("--data_seed", choices=["shared", "per_run"], default="shared",
+                    help="shared: mesma seed (e dataset) para runs que só mudam lr/epochs/poly; "
+                         "per_run: seed + primeiro run_id de cada grupo lr x epochs")
+    ap.add_argument("--compact", action="store_true", help="treina no coreset ponderado (dataset_io.compact)")
+    ap.add_argument("--compact_bins", type=int, default=0, help="com --compact: grade k^4 em vez do dedup exato")
+    ap.add_argument("--solver", choices=["gd", "newton", "lbfgs"], default="gd",
+                    help="newton/lbfgs treinam até convergir: o grid deixa de variar lr/epochs "
+                         "(36 runs, gravados em out_dir/<solver>/)")
+    ap.add_argument("--folds", type=int, default=5,
+                    help="validação cruzada k-fold (val_acc = média ± desvio); 1 = um split 80/20")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="processos do grid, cada um com BLAS em 1 thread; com menos grupos que processos, "
+                         "os que sobram treinam os folds de cada grupo em paralelo")
+    ap.add_argument("--fresh", action="store_true", help="apaga o store out_dir/results e refaz todos os runs")
     args = ap.parse_args()
+    if args.solver != "gd":
+        # o grid sem lr/epochs tem outra numeração (1..36): num subdiretório próprio ele não
+        # sobrescreve os run_<id> do grid GD (lidos por test_learning.py e halving_search.py)
+        args.out_dir = os.path.join(args.out_dir, args.solver)
     os.makedirs(args.out_dir, exist_ok=True)
 
-    # hiperparâmetros (grid leve e eficiente)
-    EPISODES = [60, 120, 200]
-    GAPS     = [170, 150, 130]        # 170 = fácil; 130 = mais difícil
-    EPSILONS = [0.05, 0.15]           # ruído na política (generalização)
-    LRS      = [0.05, 0.1]
-    EPOCHS   = [60, 100]
-    POLY     = [1, 2]                 # grau das features
+    lrs, epochs_grid = (LRS, EPOCHS) if args.solver == "gd" else ([None], [None])   # newton/lbfgs: vazios no summary
 
+    # store de resultados: um JSON por run concluído, gravado assim que o grupo termina.
+    # Ao reiniciar, runs com o mesmo config e as mesmas configurações globais são pulados
     summary_path = os.path.join(args.out_dir, "summary.csv")
-    with open(summary_path, "w", newline="") as f:
-        wr = csv.writer(f)
-        wr.writerow(["run_id","episodes","gap","epsilon","lr","epochs","poly","val_acc","weights_path"])
-
-    best = (-1.0, None)  # (acc, path)
-    run_id = 0
-
-    for episodes, gap, epsilon, lr, epochs, poly in itertools.product(
-            EPISODES, GAPS, EPSILONS, LRS, EPOCHS, POLY
-    ):
-        run_id += 1
-        print(f"\n[RUN {run_id}] ep={episodes} gap={gap} eps={epsilon} lr={lr} epc={epochs} poly={poly}")
-        # dados
-        X, y = collect_array(episodes=episodes, gap=gap, epsilon=epsilon, seed=args.seed+run_id)
-        if poly > 1:
-            X = poly_features(X, degree=poly)
-        # treino
-        w, b, mean, std, acc_va = train_logreg_numpy(X, y, lr=lr, epochs=epochs)
-        weights = {"w":w, "b":b, "mean":mean, "std":std}
-        out_path = os.path.join(args.out_dir, f"run_{run_id}_weights.npy")
-        np.save(out_path, weights, allow_pickle=True)
-        # log
-        with open(summary_path, "a", newline="") as f:
-            wr = csv.writer(f)
-            wr.writerow([run_id, episodes, gap, epsilon, lr, epochs, poly, f"{acc_va:.4f}", out_path])
-        print(f"→ val_acc={acc_va:.4f} | weights: {out_path}")
-
-        if acc_va > best[0]:
-            best = (acc_va, out_path)
-
-    # salva melhor em nome fixo
-    if best[1] is not None:
+    results_dir = os.path.join(args.out_dir, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    settings = {"seed": args.seed, "data_seed": args.data_seed, "compact": args.compact,
+                "compact_bins": args.compact_bins, "solver": args.solver, "folds": args.folds,
+                "code": data_code_version()}
+    if args.fresh:
+        for name in os.listdir(results_dir):
+            if name.startswith("run_") and name.endswith(".json"):
+                os.remove(os.path.join(results_dir, name))
+    done = load_results(results_dir, settings)
+
+    # runs que só diferem em lr/epochs usam o mesmo dataset e o mesmo split:
+    # um treino em lote (train_logreg_grid) por grupo cobre todos eles
+    configs = grid_configs(lrs, epochs_grid)
+    groups = {}
+    for run_id, c in configs.items():
+        groups.setdefault((c["episodes"], c["gap"], c["epsilon"], c["poly"]), []).append((run_id, c["lr"], c["epochs"]))
+    done = {rid: rec for rid, rec in done.items()
+            if rid in configs and all(rec[k] == configs[rid][k] for k in CONFIG_FIELDS)}
+    pending = [(key, runs) for key, runs in groups.items() if any(rid not in done for rid, _, _ in runs)]
+    write_summary(summary_path, done.values())
+    print(f"{len(done)}/{len(configs)} runs já concluídos em {results_dir}; {len(pending)} grupos a treinar "
+          f"com {args.workers} processo(s)")
+
+    def header(key, runs):
+        episodes, gap, epsilon, poly = key
+        print(f"\n[RUNS {','.join(str(r) for r, _, _ in runs)}] ep={episodes} gap={gap} eps={epsilon} poly={poly} "
+              f"lr={lrs} epc={epochs_grid}")
+
+    def finish(rows):
+        # pesos e registro de cada run gravados atomicamente; o summary é refeito a partir do store
+        for run_id, lr, epochs, w, b, mean, std, acc_va, acc_std in rows:
+            out_path = os.path.join(args.out_dir, f"run_{run_id}_weights.npy")
+            weights = {"w":w, "b":b, "mean":mean, "std":std}
+            _atomic_write(out_path, lambda f: np.save(f, weights, allow_pickle=True), "wb")
+            rec = {"run_id": run_id, **configs[run_id], "val_acc": float(acc_va), "val_acc_std": float(acc_std),
+                   "folds": args.folds, "weights_path": out_path, "settings": settings}
+            _atomic_write(os.path.join(results_dir, f"run_{run_id}.json"), lambda f: json.dump(rec, f, indent=1))
+            done[run_id] = rec
+            print(f"→ run {run_id} lr={lr} epc={epochs}: val_acc={acc_va:.4f} ± {acc_std:.4f} | weights: {out_path}")
+        write_summary(summary_path, done.values())
+
+    # processos que sobram (menos grupos que workers) vão para os folds de cada grupo
+    group_workers = max(1, min(args.workers, len(pending)))
+    opts = {"seed": args.seed, "data_seed": args.data_seed, "cache_dir": args.cache_dir, "compact": args.compact,
+            "compact_bins": args.compact_bins, "solver": args.solver, "folds": args.folds,
+            "lrs": lrs, "epochs": epochs_grid, "fold_workers": max(1, args.workers // group_workers)}
+    failed = 0
+    if group_workers <= 1:
+        for key, runs in pending:
+            header(key, runs)
+            finish(run_group(*key, runs, opts))
+    else:
+        # pool persistente: cada worker treina grupos inteiros; resultados gravados na ordem em que terminam
+        with parallel_train.pinned_pool(group_workers) as pool:
+            futures = {pool.submit(run_group, *key, runs, opts): (key, runs) for key, runs in pending}
+            for fut in as_completed(futures):
+                key, runs = futures[fut]
+                header(key, runs)
+                try:
+                    finish(fut.result())
+                except Exception as e:   # os outros grupos continuam; o próximo início refaz este
+                    failed += 1
+                    print(f"[erro] {type(e).__name__}: {e}")
+
+    # salva melhor em nome fixo (entre todos os runs do store, inclusive de execuções anteriores)
+    best = max(sorted(done.values(), key=lambda r: r["run_id"]), key=lambda r: r["val_acc"], default=None)
+    if best is not None:
         best_copy = os.path.join(args.out_dir, "best_weights.npy")
-        W = np.load(best[1], allow_pickle=True)
-        np.save(best_copy, W, allow_pickle=True)
-        print(f"\n✓ Melhor modelo: acc={best[0]:.4f} | salvo em {best_copy}")
+        W = np.load(best["weights_path"], allow_pickle=True)
+        _atomic_write(best_copy, lambda f: np.save(f, W, allow_pickle=True), "wb")
+        print(f"\n✓ Melhor modelo: run {best['run_id']} acc={best['val_acc']:.4f} | salvo em {best_copy}")
         print(f"Resumo dos runs: {summary_path}")
     else:
         print("Nenhum modelo treinado? Verifique o grid.")
+    if failed:
+        print(f"{failed} grupo(s) falharam; rode de novo para completar só os que faltam")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,35 @@
+"""
+Sementes reprodutíveis por episódio/pista/worker via numpy.random.SeedSequence.
+
+Cada episódio e tem seu próprio SeedSequence(master_seed, spawn_key=(e,)), de onde
+saem dois fluxos independentes: a semente do random.Random do env (sorteio dos
+canos) e um np.random.Generator para o ruído epsilon. Como o fluxo depende só de
+(master_seed, e), o dataset é o mesmo não importa quantos processos dividam os
+episódios nem em que ordem eles rodam.
+"""
+from typing import Iterable, List, Tuple
+import numpy as np
+
+
+def episode_sequence(master_seed: int, episode: int) -> np.random.SeedSequence:
+    return np.random.SeedSequence(master_seed, spawn_key=(episode,))
+
+
+def _to_int_seed(ss: np.random.SeedSequence) -> int:
+    return int.from_bytes(ss.generate_state(4, np.uint32).tobytes(), "little")
+
+
+def episode_rngs(master_seed: int, episode: int) -> Tuple[int, np.random.Generator]:
+    """(semente do env, gerador do ruído epsilon) do episódio `episode`."""
+    env_ss, noise_ss = episode_sequence(master_seed, episode).spawn(2)
+    return _to_int_seed(env_ss), np.random.default_rng(noise_ss)
+
+
+def env_seeds(master_seed: int, episodes: Iterable[int]) -> List[int]:
+    """Sementes de env de vários episódios (ex.: uma por pista do VecFlappyEnv)."""
+    return [_to_int_seed(episode_sequence(master_seed, e).spawn(2)[0]) for e in episodes]
+
+
+def worker_sequences(master_seed: int, n_workers: int) -> List[np.random.SeedSequence]:
+    """Fluxos independentes por worker, para aleatoriedade que não pertence a um episódio."""
+    return np.random.SeedSequence(master_seed).spawn(n_workers)
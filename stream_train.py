@@ -0,0 +1,160 @@
+"""
+Treino out-of-core da regressão logística: SGD em mini-lotes embaralhados, com
+momentum ou Adam, lendo o dataset em pedaços (leituras diretas de um .fds ou CSV em chunks).
+Uma thread de fundo lê o próximo pedaço enquanto o atual treina, então a memória
+fica em ~(prefetch + 2) pedaços, qualquer que seja o tamanho do dataset.
+
+Usado por train_logreg.py --stream; o arquivo salvo é o mesmo {"w","b","mean","std"}.
+"""
+import queue
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple
+import numpy as np
+import dataset_io
+
+Chunk = List[Tuple[int, int]]   # faixas [a, b) de linhas lidas juntas
+
+
+def plan_chunks(path: str, chunk_rows: int, where: Optional[str] = None) -> List[Chunk]:
+    """Divide as linhas de um .fds (ou de um store filtrado) em pedaços de até chunk_rows."""
+    if where:
+        ranges = dataset_io.DatasetStore(path).ranges(where)
+    else:
+        ranges = [(0, dataset_io.dataset_rows(path))]
+    chunks, cur, size = [], [], 0
+    for a, b in ranges:
+        while a < b:
+            take = min(b - a, chunk_rows - size)
+            cur.append((a, a + take))
+            size += take
+            a += take
+            if size == chunk_rows:
+                chunks.append(cur)
+                cur, size = [], 0
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def iter_chunks(path: str, chunk_rows: int, where: Optional[str] = None,
+                rng: Optional[np.random.Generator] = None) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    (id do pedaço, X float32, y float32) em memória. Num .fds a ordem dos pedaços é
+    sorteada por `rng`; um CSV só pode ser lido em sequência.
+    """
+    if dataset_io.is_fds(path):
+        chunks = plan_chunks(path, chunk_rows, where)
+        order = rng.permutation(len(chunks)) if rng is not None else range(len(chunks))
+        for c in order:
+            parts = [dataset_io.read_rows(path, a, b, ("X", "action")) for a, b in chunks[c]]
+            X = parts[0]["X"] if len(parts) == 1 else np.concatenate([p["X"] for p in parts])
+            y = np.concatenate([p["action"] for p in parts]).astype(np.float32)
+            yield int(c), X.astype(np.float32, copy=False), y
+    else:
+        if where:
+            raise ValueError("--where exige um store .fds")
+        import pandas as pd
+        for c, df in enumerate(pd.read_csv(path, chunksize=chunk_rows)):
+            yield c, df[dataset_io.FEATURES].values.astype(np.float32), df["action"].values.astype(np.float32)
+
+
+class Prefetcher:
+    """Consome um gerador numa thread de fundo, deixando até `depth` itens prontos."""
+    _END = object()
+
+    def __init__(self, items: Iterator, depth: int = 1):
+        self._q = queue.Queue(maxsize=max(depth, 1))
+        self._err = None
+        self._thread = threading.Thread(target=self._run, args=(items,), daemon=True)
+        self._thread.start()
+
+    def _run(self, items):
+        try:
+            for item in items:
+                self._q.put(item)
+        except BaseException as e:   # repassado para quem consome
+            self._err = e
+        finally:
+            self._q.put(self._END)
+
+    def __iter__(self):
+        while True:
+            item = self._q.get()
+            if item is self._END:
+                if self._err is not None:
+                    raise self._err
+                return
+            yield item
+
+
+def _val_mask(seed: int, chunk_id: int, n: int, val_split: float) -> np.ndarray:
+    """Linhas de validação de um pedaço: fixas entre épocas (rng por (seed, pedaço))."""
+    return np.random.default_rng([seed, chunk_id]).random(n) < val_split
+
+
+def train_stream(path: str, epochs: int = 5, lr: float = 0.01, batch_size: int = 256, chunk_rows: int = 1 << 20,
+                 optimizer: str = "adam", momentum: float = 0.9, beta2: float = 0.999, val_split: float = 0.2,
+                 seed: int = 0, where: Optional[str] = None, prefetch: int = 1, workers: int = 1,
+                 log: Optional[Callable[[str], None]] = print) -> dict:
+    """
+    SGD em mini-lotes sobre `path` sem carregar o dataset. Cada época sorteia a ordem
+    dos pedaços e das linhas dentro de cada pedaço. As métricas são progressivas (sem
+    passada extra): acc_tr mede cada lote antes do passo nele, acc_va mede as linhas de
+    validação de cada pedaço logo depois de treinar no resto dele.
+    """
+    if optimizer not in ("sgd", "momentum", "adam"):
+        raise ValueError(f"otimizador desconhecido: {optimizer}")
+    # média/desvio do manifesto do dataset; na primeira vez, uma passada em pedaços
+    stats = dataset_io.feature_stats(path, where, workers=workers, chunk_rows=chunk_rows)
+    if stats.n == 0:
+        raise ValueError(f"dataset vazio: {path}")
+    mean = np.asarray(stats.mean, dtype=np.float32).reshape(1, -1)
+    std = (np.asarray(stats.std, dtype=np.float32) + 1e-6).reshape(1, -1)
+    d = mean.shape[1]
+
+    # theta = [w; b]; estado do otimizador no mesmo formato
+    theta = np.zeros(d + 1, dtype=np.float64)
+    m = np.zeros_like(theta)
+    v = np.zeros_like(theta)
+    t = 0
+    rng = np.random.default_rng(seed)
+    eps = 1e-8
+
+    for ep in range(1, epochs + 1):
+        loss_sum = n_tr = hit_tr = n_va = hit_va = 0
+        for c, X, y in Prefetcher(iter_chunks(path, chunk_rows, where, rng), prefetch):
+            X -= mean
+            X /= std
+            va = _val_mask(seed, c, len(X), val_split)
+            tr = np.flatnonzero(~va)
+            rng.shuffle(tr)
+            for s in range(0, len(tr), batch_size):
+                rows = tr[s:s + batch_size]
+                xb, yb = X[rows], y[rows]
+                p = 1.0 / (1.0 + np.exp(-(xb @ theta[:d] + theta[d])))
+                loss_sum -= float(np.sum(yb * np.log(p + eps) + (1 - yb) * np.log(1 - p + eps)))
+                hit_tr += int(((p >= 0.5) == (yb >= 0.5)).sum())
+                n_tr += len(rows)
+                g = p - yb
+                grad = np.empty_like(theta)
+                grad[:d] = xb.T @ g / len(rows)
+                grad[d] = g.mean()
+                if optimizer == "sgd":
+                    theta -= lr * grad
+                elif optimizer == "momentum":
+                    m = momentum * m + grad
+                    theta -= lr * m
+                else:
+                    t += 1
+                    m = momentum * m + (1 - momentum) * grad
+                    v = beta2 * v + (1 - beta2) * grad * grad
+                    theta -= lr * (m / (1 - momentum ** t)) / (np.sqrt(v / (1 - beta2 ** t)) + 1e-8)
+            if va.any():
+                p_va = X[va] @ theta[:d] + theta[d] >= 0.0
+                hit_va += int((p_va == (y[va] >= 0.5)).sum())
+                n_va += int(va.sum())
+        if log and (ep % 5 == 0 or ep == 1 or ep == epochs):
+            log(f"[{ep:03d}] loss={loss_sum / max(n_tr, 1):.4f} acc_tr={hit_tr / max(n_tr, 1):.3f} "
+                f"acc_va={hit_va / max(n_va, 1):.3f}")
+
+    return {"w": theta[:d].astype(np.float32).reshape(-1, 1), "b": float(theta[d]), "mean": mean, "std": std}
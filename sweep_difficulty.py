@@ -0,0 +1,73 @@
+import argparse
+import csv
+from dataclasses import replace
+import numpy as np
+from game_env import VecFlappyEnv, Config
+from expert_policy import expert_action_batch
+from seeding import env_seeds
+
+def linear_batch(weights):
+    """Política em lote a partir de um pack {"w","b","mean","std"} (grau 1 ou 2): caminho .npy ou o dict."""
+    pack = np.load(weights, allow_pickle=True).item() if isinstance(weights, str) else weights
+    w = np.asarray(pack["w"], dtype=np.float64).reshape(-1, 1)
+    b, mean, std = float(pack["b"]), pack["mean"], pack["std"]
+    def act(obs):
+        X = obs
+        if w.shape[0] != obs.shape[1]:
+            from run_experiments import poly_features
+            X = poly_features(obs, degree=2)
+        return (((X - mean) / (std + 1e-6)) @ w + b >= 0.0).astype(np.int64).ravel()
+    return act
+
+def score_vs_gap(gaps, episodes=50, policy=expert_action_batch, seed=42, max_steps=2000, base: Config = Config()):
+    """
+    Roda `episodes` episódios para cada gap numa única VecFlappyEnv (uma pista por
+    episódio). Todos os gaps usam as mesmas seeds de percurso, então as diferenças
+    entre linhas vêm só da dificuldade. Devolve uma linha por gap.
+    """
+    cfgs = [replace(base, pipe_gap=g, max_steps=max_steps) for g in gaps for _ in range(episodes)]
+    env = VecFlappyEnv.from_configs(cfgs, seeds=env_seeds(seed, range(episodes)) * len(gaps))
+    n = env.num_envs
+    scores = np.zeros(n, dtype=np.int64)
+    steps = np.zeros(n, dtype=np.int64)
+    finished = np.zeros(n, dtype=bool)
+    obs, _ = env.reset()
+    while not finished.all():
+        obs, _, dones, info = env.step(policy(obs))
+        first = dones & ~finished
+        scores[first] = info["score"][first]
+        steps[first] = info["steps"][first]
+        finished |= dones
+    table = []
+    for i, g in enumerate(gaps):
+        sc = scores[i * episodes:(i + 1) * episodes]
+        st = steps[i * episodes:(i + 1) * episodes]
+        table.append({"gap": g, "score_mean": sc.mean(), "score_std": sc.std(),
+                      "steps_mean": st.mean(), "success_rate": (sc > 0).mean()})
+    return table
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gaps", type=int, nargs="+", default=[130, 150, 170, 250, 300, 400, 500])
+    ap.add_argument("--episodes", type=int, default=50, help="episódios por gap")
+    ap.add_argument("--max_steps", type=int, default=2000)
+    ap.add_argument("--weights", type=str, default=None, help="pack .npy; sem ele usa o expert")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", type=str, default=None, help="CSV opcional com a tabela")
+    args = ap.parse_args()
+
+    policy = linear_batch(args.weights) if args.weights else expert_action_batch
+    table = score_vs_gap(args.gaps, args.episodes, policy, args.seed, args.max_steps)
+    print(f"{'gap':>5} {'score':>8} {'±':>6} {'steps':>8} {'sucesso':>8}")
+    for row in table:
+        print(f"{row['gap']:>5} {row['score_mean']:>8.2f} {row['score_std']:>6.2f} "
+              f"{row['steps_mean']:>8.1f} {row['success_rate'] * 100:>7.1f}%")
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            wr = csv.DictWriter(f, fieldnames=list(table[0].keys()))
+            wr.writeheader()
+            wr.writerows(table)
+        print(f"tabela salva em {args.out}")
+
+if __name__ == "__main__":
+    main()
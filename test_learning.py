@@ -3,7 +3,7 @@
 
 import numpy as np
 import os
-from game_env import FlappyEnv, Config
+from game_env import FlappyEnv, Config, CourseTable
 from expert_policy import expert_action
 
 def sigmoid(z):
@@ -27,14 +27,14 @@ def model_action(obs, weights_dict):
     prob = sigmoid(z)
     return 1 if prob > 0.5 else 0
 
-def test_model(weights_file, num_episodes=10):
-    """Testa um modelo específico"""
+def test_model(weights_file, num_episodes=10, course=None):
+    """Testa um modelo específico (num percurso comum, se `course` for dado)"""
     if not os.path.exists(weights_file):
         return None
     
     weights_dict = np.load(weights_file, allow_pickle=True).item()
     config = Config(pipe_gap=400, seed=42)
-    env = FlappyEnv(config)
+    env = FlappyEnv(config, course=course)
     
     total_score = 0
     total_steps = 0
@@ -68,10 +68,10 @@ def test_model(weights_file, num_episodes=10):
         'total_episodes': num_episodes
     }
 
-def test_expert_policy(num_episodes=10):
+def test_expert_policy(num_episodes=10, course=None):
     """Testa a política expert para comparação"""
     config = Config(pipe_gap=400, seed=42)
-    env = FlappyEnv(config)
+    env = FlappyEnv(config, course=course)
     
     total_score = 0
     total_steps = 0
@@ -109,9 +109,12 @@ def main():
     print("🤖 TESTE DE APRENDIZADO DA IA - Flappy Bird")
     print("=" * 50)
     
+    # Mesmo percurso (canos pré-sorteados) para todos: comparação com números aleatórios comuns
+    course = CourseTable.load(seed=42, episodes=20, cfg=Config(pipe_gap=400, max_steps=1000))
+
     # Testa política expert primeiro
     print("🧠 Testando Política Expert (baseline)...")
-    expert_results = test_expert_policy(20)
+    expert_results = test_expert_policy(20, course)
     if expert_results:
         print(f"   📊 Score médio: {expert_results['avg_score']:.2f}")
         print(f"   ⏱️  Steps médios: {expert_results['avg_steps']:.1f}")
@@ -133,7 +136,7 @@ def main():
     
     for model_file in models_to_test:
         print(f"\n🔍 Testando: {model_file}")
-        result = test_model(model_file, 15)
+        result = test_model(model_file, 15, course)
         
         if result:
             print(f"   📊 Score médio: {result['avg_score']:.2f}")
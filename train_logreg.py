@@ -1,65 +1,120 @@
 import argparse
 import numpy as np
-import pandas as pd
+from dataset_io import load_xy, compact, feature_stats
+import logreg
 
 def sigmoid(z):
     return 1.0 / (1.0 + np.exp(-z))
 
-def accuracy(y_true, y_pred):
-    return np.mean((y_pred >= 0.5) == y_true)
+def accuracy(y_true, y_pred, weights=None):
+    return np.average((y_pred >= 0.5) == y_true, weights=weights)
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--data", type=str, default="data.csv")
+    ap.add_argument("--data", type=str, default="data.csv", help="CSV ou dataset .fds")
+    ap.add_argument("--where", type=str, default=None,
+                    help='filtro de episódios de um store, p.ex. "gap==150 and epsilon<0.1"')
     ap.add_argument("--lr", type=float, default=0.1)
     ap.add_argument("--epochs", type=int, default=50)
     ap.add_argument("--save", type=str, default="weights.npy")
     ap.add_argument("--val_split", type=float, default=0.2)
+    ap.add_argument("--compact", action="store_true", help="treina em linhas únicas com pesos (dedup exato)")
+    ap.add_argument("--compact_bins", type=int, default=0, help="agrupa numa grade k^4 em vez do dedup exato")
+    ap.add_argument("--stream", action="store_true",
+                    help="SGD em mini-lotes lendo o dataset em pedaços (memória limitada, ver stream_train)")
+    ap.add_argument("--optimizer", type=str, default="adam", choices=["sgd", "momentum", "adam"])
+    ap.add_argument("--batch_size", type=int, default=256)
+    ap.add_argument("--chunk_rows", type=int, default=1 << 20, help="linhas por pedaço lido do disco")
+    ap.add_argument("--seed", type=int, default=0, help="seed do split treino/val (e do embaralhamento no --stream)")
+    ap.add_argument("--solver", type=str, default="gd", choices=["gd", "newton", "lbfgs"],
+                    help="newton/lbfgs param por tolerância (--tol) e ignoram --lr/--epochs")
+    ap.add_argument("--tol", type=float, default=1e-6, help="max |gradiente| para parar (newton/lbfgs)")
+    ap.add_argument("--max_iter", type=int, default=100)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="processos para o gradiente do GD (shards em shared_memory, ver parallel_train); "
+                         "no --stream, para a passada de média/desvio")
     args = ap.parse_args()
 
-    df = pd.read_csv(args.data)
-    X = df[["y_norm","vy_norm","dist_norm","delta_gap_norm"]].values.astype(np.float32)
-    y = df["action"].values.astype(np.float32).reshape(-1,1)
+    if args.stream:
+        if args.compact or args.compact_bins:
+            raise ValueError("--compact não combina com --stream")
+        if args.solver != "gd":
+            raise ValueError("--solver newton/lbfgs não combina com --stream (SGD em mini-lotes)")
+        from stream_train import train_stream
+        pack = train_stream(args.data, epochs=args.epochs, lr=args.lr, batch_size=args.batch_size,
+                            chunk_rows=args.chunk_rows, optimizer=args.optimizer, val_split=args.val_split,
+                            seed=args.seed, where=args.where, workers=args.workers)
+        np.save(args.save, pack, allow_pickle=True)
+        print(f"pesos salvos em {args.save}")
+        return
 
-    # normalização simples (já estão razoavelmente normalizadas, mas padronizamos vy_norm e delta_gap_norm)
-    mean = X.mean(axis=0, keepdims=True)
-    std = X.std(axis=0, keepdims=True) + 1e-6
-    Xn = (X - mean) / std
+    X, y = load_xy(args.data, where=args.where)   # CSV ou .fds (memmap)
+    y = np.asarray(y, dtype=np.float32).reshape(-1)
 
-    # split treino/val
-    n = len(Xn)
-    idx = np.arange(n)
-    np.random.shuffle(idx)
+    # split treino/val como máscara sobre as linhas originais (sem cópia do dataset)
+    n = len(X)
+    idx = np.random.default_rng(args.seed).permutation(n)
     cut = int(n*(1.0-args.val_split))
-    tr, va = idx[:cut], idx[cut:]
-    Xtr, ytr = Xn[tr], y[tr]
-    Xva, yva = Xn[va], y[va]
+    train = np.zeros(n, dtype=bool)
+    train[idx[:cut]] = True
+    Xv, val = X, ~train   # validação: linhas `val` de Xv
+    yva = y[val]
+    sw = None
+    if args.compact or args.compact_bins:
+        # o split vem antes: só o treino vira coreset, e a validação continua nas linhas
+        # brutas (com --compact_bins as linhas do coreset são médias de célula, não observações)
+        Xv, val = np.asarray(X[~train]), None
+        X, y, counts = compact(X[train], y[train], bins=args.compact_bins or None)
+        y = y.astype(np.float32)
+        sw = counts.astype(np.float32)
+        train = np.ones(len(X), dtype=bool)
+        print(f"coreset do treino: {cut} -> {len(X)} linhas (compressão {cut/len(X):.1f}x)")
+    ytr = y[train]
+    wtr = None if sw is None else sw[train]
 
-    # pesos (w, b)
-    w = np.zeros((Xtr.shape[1], 1), dtype=np.float32)
-    b = 0.0
+    # normalização simples (já estão razoavelmente normalizadas, mas padronizamos vy_norm e delta_gap_norm).
+    # média/desvio vêm do manifesto do dataset (na primeira vez, uma passada em pedaços);
+    # com --compact, ponderados pelas contagens do coreset
+    if sw is None:
+        stats = feature_stats(args.data, args.where, workers=args.workers)
+        mean = np.asarray(stats.mean, dtype=np.float32).reshape(1,-1)
+        std = np.asarray(stats.std, dtype=np.float32).reshape(1,-1) + 1e-6
+    else:
+        mean = np.average(X, axis=0, weights=sw).reshape(1,-1).astype(np.float32)
+        std = np.sqrt(np.average((X - mean)**2, axis=0, weights=sw)).reshape(1,-1).astype(np.float32) + 1e-6
 
-    for ep in range(1, args.epochs+1):
-        # forward
-        z = Xtr @ w + b
-        p = sigmoid(z)
-        # loss BCE
-        eps = 1e-8
-        loss = -(ytr*np.log(p+eps) + (1-ytr)*np.log(1-p+eps)).mean()
-        # grad
-        dz = (p - ytr) / len(Xtr)
-        dw = Xtr.T @ dz
-        db = dz.sum()
-        # step GD
-        w -= args.lr * dw
-        b -= args.lr * db
-
-        if ep % 5 == 0 or ep == 1 or ep == args.epochs:
-            p_tr = sigmoid(Xtr @ w + b)
-            p_va = sigmoid(Xva @ w + b)
-            acc_tr = accuracy(ytr, p_tr)
-            acc_va = accuracy(yva, p_va)
-            print(f"[{ep:03d}] loss={loss:.4f} acc_tr={acc_tr:.3f} acc_va={acc_va:.3f}")
+    if args.solver != "gd":
+        # Newton/L-BFGS usam a matriz de treino padronizada em memória
+        Xtr = np.asarray(X[train], dtype=np.float32)
+        Xva = np.asarray(Xv if val is None else Xv[val], dtype=np.float32)
+        Xtr -= mean; Xtr /= std
+        Xva -= mean; Xva /= std
+        w, b, info = logreg.fit(Xtr, ytr, args.solver, sample_weight=wtr, tol=args.tol, max_iter=args.max_iter)
+        acc_tr = accuracy(ytr, sigmoid(Xtr @ w + b).ravel(), wtr)
+        acc_va = accuracy(yva, sigmoid(Xva @ w + b).ravel())
+        print(f"[{args.solver}] {info['iters']} iterações, {info['passes']} passadas, "
+              f"{'convergiu' if info['converged'] else 'NÃO convergiu'} | "
+              f"loss={info['loss']:.4f} acc_tr={acc_tr:.3f} acc_va={acc_va:.3f}")
+    else:
+        # GD em float32 com buffers fixos, padronizando bloco a bloco sobre X cru (ou memmap);
+        # loss só nas épocas que aparecem no log; com --workers, o gradiente é somado entre processos
+        if args.workers > 1:
+            from parallel_train import ParallelGD
+            trainer = ParallelGD(X, y, sw, mean=mean, std=std, mask=train, workers=args.workers)
+        else:
+            trainer = logreg.GDTrainer(X, y, sw, mean=mean, std=std, mask=train)
+        try:
+            for ep in range(1, args.epochs+1):
+                log_ep = ep % 5 == 0 or ep == 1 or ep == args.epochs
+                loss = trainer.step(args.lr, with_loss=log_ep)
+                if log_ep:
+                    acc_tr = accuracy(ytr, trainer.predict(X, train).ravel(), wtr)
+                    acc_va = accuracy(yva, trainer.predict(Xv, val).ravel())
+                    print(f"[{ep:03d}] loss={loss:.4f} acc_tr={acc_tr:.3f} acc_va={acc_va:.3f}")
+            w, b = trainer.weights()
+        finally:
+            if args.workers > 1:
+                trainer.close()
 
     # salvar pesos + normalização (para uso na inferência)
     np.save(args.save, {"w":w, "b":b, "mean":mean, "std":std}, allow_pickle=True)